@@ -0,0 +1,379 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import tornado.web
+from tornado.ioloop import IOLoop
+
+import main
+from main import ActivityLog, HistoryRetention, Priority, ProjectManagement, Status, Task, TaskArchive, UserDatabase, touch_project
+
+API_PORT = 8600
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 5000
+
+
+# Class to keep the users database in memory for the API process
+class Store:
+    def __init__(self) -> None:
+        """
+        Create an empty store. The database is loaded on first use and reloaded
+        whenever another process (e.g. the Streamlit app) rewrites the file.
+        """
+        self.users: Dict[str, Dict] = {}
+        self.mtime: Optional[int] = None
+        self.verified: Dict[Tuple[str, str], str] = {}  # (username, password digest) -> stored bcrypt hash
+        # Requests that change the users hold this lock from loading them until they finish, so
+        # no other request loads or changes them while they are being changed and saved
+        self.write_lock = asyncio.Lock()
+
+    def current(self) -> Dict[str, Dict]:
+        """
+        Return the users, reloading them if the database file changed on disk.
+        """
+        try:
+            mtime = os.stat(main.DATABASE_FILE).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self.mtime:
+            self.users = UserDatabase.load_users()
+            self.mtime = mtime
+        return self.users
+
+    async def save(self, users: Dict[str, Dict]) -> None:
+        """
+        Persist the users a request changed and remember the new file version so it is not reloaded.
+        The file is written on a worker thread; the caller holds write_lock.
+        """
+        await IOLoop.current().run_in_executor(None, UserDatabase.save_users, users)
+        self.users = users
+        self.mtime = os.stat(main.DATABASE_FILE).st_mtime_ns
+
+    async def authenticate(self, users: Dict[str, Dict], username: str, password: str) -> bool:
+        """
+        Check a user's password. Successful checks are remembered for as long as the
+        stored hash is unchanged, so bcrypt only runs once per credential, on a worker
+        thread so other connections are served in the meantime.
+        """
+        import bcrypt  # Only loaded when a password is actually checked
+
+        user = users.get(username)
+        if user is None or not user.get("active", False):
+            return False
+        key = (username, hashlib.sha256(password.encode('utf-8')).hexdigest())
+        if self.verified.get(key) == user["password"]:
+            return True
+        if await IOLoop.current().run_in_executor(None, bcrypt.checkpw, password.encode('utf-8'), user["password"].encode()):
+            self.verified[key] = user["password"]
+            return True
+        return False
+
+
+def project_summary(owner: str, project: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Return the JSON representation of a project without its tasks.
+    """
+    return {
+        "owner": owner,
+        "id": project["id"],
+        "title": project["title"],
+        "description": project["description"],
+        "members": project["members"],
+        "version": project.get("version", 0),
+        "task_count": len(project["tasks"]),
+    }
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    WRITE_METHODS = ("POST", "PATCH")
+
+    def initialize(self, store: Store) -> None:
+        self.store = store
+        self.locked = False
+
+    async def prepare(self) -> None:
+        """
+        Authenticate every request with HTTP Basic credentials and load the users it works on.
+        Requests that change them hold the store's write lock until they finish.
+        """
+        if self.request.method in self.WRITE_METHODS:
+            await self.store.write_lock.acquire()
+            self.locked = True
+        self.users = self.store.current()
+        header = self.request.headers.get("Authorization", "")
+        username = None
+        if header.startswith("Basic "):
+            try:
+                username, _, password = base64.b64decode(header[6:]).decode('utf-8').partition(":")
+            except ValueError:
+                username = None
+            if username is not None and not await self.store.authenticate(self.users, username, password):
+                username = None
+        if username is None:
+            self.set_header("WWW-Authenticate", 'Basic realm="trellomize"')
+            raise tornado.web.HTTPError(401)
+        self.username = username
+
+    def on_finish(self) -> None:
+        if self.locked:
+            self.locked = False
+            self.store.write_lock.release()
+
+    def compute_etag(self) -> Optional[str]:
+        # ETags are derived from project versions before the body is built, see not_modified
+        return None
+
+    def write_error(self, status_code: int, **kwargs: Any) -> None:
+        self.write_json({"error": self._reason}, status_code)
+
+    def write_json(self, data: Any, status_code: int = 200) -> None:
+        self.set_status(status_code)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(data, default=UserDatabase.serialize))
+
+    def not_modified(self, *parts: Any) -> bool:
+        """
+        Set an ETag built from the given parts and answer 304 if the client already has it.
+        """
+        self.set_header("Etag", '"' + hashlib.sha1(repr(parts).encode('utf-8')).hexdigest() + '"')
+        if self.check_etag_header():
+            self.set_status(304)
+            self.finish()
+            return True
+        return False
+
+    def page(self) -> Tuple[int, int]:
+        """
+        Return the offset and limit query arguments, within bounds.
+        """
+        try:
+            offset = max(int(self.get_query_argument("offset", "0")), 0)
+            limit = min(max(int(self.get_query_argument("limit", str(PAGE_SIZE))), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="offset and limit must be integers")
+        return offset, limit
+
+    def body(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.request.body or b"{}")
+        except json.JSONDecodeError:
+            raise tornado.web.HTTPError(400, reason="Invalid JSON body")
+        if not isinstance(data, dict):
+            raise tornado.web.HTTPError(400, reason="JSON body must be an object")
+        return data
+
+    def project(self, users: Dict[str, Dict], owner: str, project_id: str, write: bool = False) -> Dict[str, Any]:
+        """
+        Return a project of the given users that the current user may access. Only the owner may change it.
+        """
+        project = next((project for project in users.get(owner, {}).get("projects", {}).get("managed", []) if project["id"] == project_id), None)
+        if project is None:
+            raise tornado.web.HTTPError(404, reason="Project ID not found")
+        if self.username != owner and (write or self.username not in project["members"]):
+            raise tornado.web.HTTPError(403, reason="Not allowed to access this project")
+        return project
+
+
+class ProjectsHandler(BaseHandler):
+    def get(self) -> None:
+        """
+        List the projects the user manages or is a member of, one page at a time.
+        """
+        offset, limit = self.page()
+        projects = [
+            (owner, project)
+            for owner, user in self.users.items()
+            for project in user["projects"]["managed"]
+            if owner == self.username or self.username in project["members"]
+        ]
+        window = projects[offset:offset + limit]
+        if self.not_modified(offset, limit, len(projects), [(owner, project["id"], project.get("version", 0)) for owner, project in window]):
+            return
+        self.write_json({
+            "projects": [project_summary(owner, project) for owner, project in window],
+            "total": len(projects),
+            "next_offset": offset + limit if offset + limit < len(projects) else None,
+        })
+
+
+class ProjectHandler(BaseHandler):
+    def get(self, owner: str, project_id: str) -> None:
+        project = self.project(self.users, owner, project_id)
+        if self.not_modified(owner, project_id, project.get("version", 0)):
+            return
+        self.write_json(project_summary(owner, project))
+
+
+class TasksHandler(BaseHandler):
+    def get(self, owner: str, project_id: str) -> None:
+        """
+        List the tasks of a project one page at a time, optionally filtered by status.
+        """
+        project = self.project(self.users, owner, project_id)
+        offset, limit = self.page()
+        status = self.get_query_argument("status", None)
+        if self.not_modified(owner, project_id, project.get("version", 0), offset, limit, status):
+            return
+        tasks = project["tasks"]
+        if status:
+            tasks = [task for task in tasks if task["status"].name == status]
+        self.write_json({
+            "tasks": tasks[offset:offset + limit],
+            "total": len(tasks),
+            "next_offset": offset + limit if offset + limit < len(tasks) else None,
+        })
+
+    async def post(self, owner: str, project_id: str) -> None:
+        """
+        Create a batch of tasks with a single write of the database.
+        """
+        project = self.project(self.users, owner, project_id, write=True)
+        items = self.batch()
+        created = []
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("title"), str) or not item["title"]:
+                raise tornado.web.HTTPError(400, reason="Every task needs a title")
+            self.validate(item, self.users)
+            task = Task(item["title"], item.get("description", ""), list(item.get("assignees", [])))
+            task.priority = self.enum(Priority, item.get("priority", Priority.LOW.name))
+            task.status = self.enum(Status, item.get("status", Status.BACKLOG.name))
+            created.append(UserDatabase.deserialize_task(task.to_dict()))
+
+        project["tasks"].extend(created)
+        archived = TaskArchive.archive(owner, project, [task for task in created if task["status"] == Status.ARCHIVED])
+        touch_project(project)
+        await self.store.save(self.users)
+        ActivityLog.record_many([(owner, project_id, self.username, f"Task '{task['title']}' created", task) for task in created] + archived)
+        self.write_json({"tasks": created, "version": project["version"]}, 201)
+
+    async def patch(self, owner: str, project_id: str) -> None:
+        """
+        Update a batch of tasks with a single write of the database. Each item holds a task
+        ID and any of title, description, status, priority and assignees.
+        """
+        project = self.project(self.users, owner, project_id, write=True)
+        items = self.batch()
+        tasks = {task["id"]: task for task in project["tasks"]}
+        if not all(isinstance(item, dict) and isinstance(item.get("id"), str) for item in items):
+            raise tornado.web.HTTPError(400, reason="Every task needs an 'id' string")
+        missing = [item["id"] for item in items if item["id"] not in tasks]
+        if missing:
+            raise tornado.web.HTTPError(404, reason=f"Task IDs not found: {', '.join(missing)}")
+
+        # Validate the whole batch first so a bad item leaves every task untouched
+        updates = []
+        for item in items:
+            if "title" in item and (not isinstance(item["title"], str) or not item["title"]):
+                raise tornado.web.HTTPError(400, reason="'title' must be a non-empty string")
+            self.validate(item, self.users)
+            status = self.enum(Status, item["status"]) if "status" in item else None
+            priority = self.enum(Priority, item["priority"]) if "priority" in item else None
+            updates.append((item, status, priority))
+
+        events = []
+        timestamp = datetime.now()
+        for item, status, priority in updates:
+            task = tasks[item["id"]]
+            assignees = item.get("assignees", task["assignees"])
+            changed = ProjectManagement.bulk_update_tasks(
+                [task],
+                status=status,
+                priority=priority,
+                add_assignees=[assignee for assignee in assignees if assignee not in task["assignees"]],
+                remove_assignees=[assignee for assignee in task["assignees"] if assignee not in assignees],
+            ).get(task["id"], [])
+            for field in ("title", "description"):
+                if field in item and item[field] != task[field]:
+                    task[field] = item[field]
+                    task["history"].append((timestamp, f"{field.capitalize()} changed"))
+                    changed.append(f"{field.capitalize()} changed")
+            events += [(owner, project_id, self.username, f"Task '{task['title']}': {change}", task) for change in changed]
+
+        if events:
+            changed_tasks = [tasks[task_id] for task_id in {event[4]["id"] for event in events}]
+            HistoryRetention.enforce(owner, project, changed_tasks)
+            # Tasks set to ARCHIVED leave the project right away, as in the app's bulk actions
+            events += TaskArchive.archive(owner, project, [task for task in changed_tasks if task["status"] == Status.ARCHIVED])
+            touch_project(project)
+            await self.store.save(self.users)
+            ActivityLog.record_many(events)
+        self.write_json({"tasks": [tasks[item["id"]] for item in items], "version": project.get("version", 0)})
+
+    def batch(self) -> List[Any]:
+        items = self.body().get("tasks")
+        if not isinstance(items, list) or not items:
+            raise tornado.web.HTTPError(400, reason="Body must contain a non-empty 'tasks' list")
+        if len(items) > MAX_BATCH_SIZE:
+            raise tornado.web.HTTPError(413, reason=f"At most {MAX_BATCH_SIZE} tasks per batch")
+        return items
+
+    @staticmethod
+    def validate(item: Dict[str, Any], users: Dict[str, Dict]) -> None:
+        """
+        Check the types of the optional description and assignees of a task item, and that every assignee exists.
+        """
+        if "description" in item and not isinstance(item["description"], str):
+            raise tornado.web.HTTPError(400, reason="'description' must be a string")
+        if "assignees" in item:
+            assignees = item["assignees"]
+            if not isinstance(assignees, list) or not all(isinstance(assignee, str) for assignee in assignees):
+                raise tornado.web.HTTPError(400, reason="'assignees' must be a list of usernames")
+            unknown = [assignee for assignee in assignees if assignee not in users]
+            if unknown:
+                raise tornado.web.HTTPError(400, reason=f"Unknown assignees: {', '.join(unknown)}")
+
+    @staticmethod
+    def enum(enum_class: Any, name: Any) -> Any:
+        try:
+            return enum_class[name]
+        except (KeyError, TypeError):
+            raise tornado.web.HTTPError(400, reason=f"Invalid {enum_class.__name__.lower()}: {name}")
+
+
+def make_app(store: Optional[Store] = None) -> tornado.web.Application:
+    """
+    Build the API application. Tornado keeps HTTP/1.1 connections alive between requests.
+
+    Args:
+        store (Optional[Store]): The store to serve, a new one by default.
+
+    Returns:
+        tornado.web.Application: The application with all API routes.
+    """
+    handler_args = {"store": store or Store()}
+    return tornado.web.Application([
+        (r"/api/projects", ProjectsHandler, handler_args),
+        (r"/api/projects/([^/]+)/([^/]+)", ProjectHandler, handler_args),
+        (r"/api/projects/([^/]+)/([^/]+)/tasks", TasksHandler, handler_args),
+    ])
+
+
+async def serve(address: str, port: int) -> None:
+    """
+    Run the API server until it is interrupted.
+
+    Args:
+        address (str): The address to listen on.
+        port (int): The port to listen on.
+
+    Returns:
+        None
+    """
+    main.setup_logging()
+    make_app().listen(port, address=address)
+    print(f"Trellomize API listening on http://{address}:{port}/api")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Trellomize REST API')
+    parser.add_argument('--address', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=API_PORT, help='Port to listen on')
+    args = parser.parse_args()
+    asyncio.run(serve(args.address, args.port))
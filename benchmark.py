@@ -0,0 +1,442 @@
+import argparse
+import json
+import os
+import re
+import socketserver
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+MAX_LOST_PER_SESSION = 20
+
+
+def import_times(module: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """
+    Imports a module in a fresh interpreter with `python -X importtime`.
+
+    Args:
+        module (str): The module to import, e.g. 'main'.
+
+    Returns:
+        Tuple[float, Dict[str, Tuple[int, int]]]: The wall-clock time of the interpreter in seconds,
+        and the self and cumulative import time in microseconds of every imported module.
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing '{module}' failed:\n{result.stderr}")
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        # Lines look like: "import time:       123 |        456 |   package.module"
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return elapsed, modules
+
+
+def startup_report(module: str, runs: int, top: int) -> None:
+    """
+    Prints a cold-start report for a module: wall-clock time over several runs and the
+    top-level imports that contribute the most to it.
+
+    Args:
+        module (str): The module to import.
+        runs (int): The number of fresh interpreters to start.
+        top (int): The number of slowest imports to list.
+
+    Returns:
+        None
+    """
+    wall_times: List[float] = []
+    samples: List[Dict[str, Tuple[int, int]]] = []
+    for _ in range(runs):
+        elapsed, modules = import_times(module)
+        wall_times.append(elapsed)
+        samples.append(modules)
+
+    # Use the median of every module's timings across runs to smooth out noise
+    names = set().union(*samples)
+    cumulative = {name: statistics.median(sample[name][1] for sample in samples if name in sample) for name in names}
+    self_total = statistics.median(sum(self_us for self_us, _ in sample.values()) for sample in samples)
+
+    print(f"Startup report for 'import {module}' ({runs} runs)")
+    print(f"  wall clock: median {statistics.median(wall_times) * 1000:.1f} ms, min {min(wall_times) * 1000:.1f} ms")
+    print(f"  import time: {self_total / 1000:.1f} ms in {len(names)} modules")
+    print("  slowest top-level imports (cumulative):")
+    top_level = sorted((name for name in names if '.' not in name), key=cumulative.__getitem__, reverse=True)
+    for name in top_level[:top]:
+        print(f"    {cumulative[name] / 1000:8.1f} ms  {name}")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    Stand-in SMTP server for load tests. It accepts any login and keeps the last
+    verification code sent to every recipient instead of delivering mail.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.codes: Dict[str, str] = {}
+        self.received = threading.Condition()
+
+    def wait_for_code(self, email: str, timeout: float = 10.0) -> str:
+        """
+        Wait until a verification code for the email address arrives and return it.
+        """
+        with self.received:
+            if not self.received.wait_for(lambda: email in self.codes, timeout):
+                raise TimeoutError(f"No verification email for {email}")
+            return self.codes.pop(email)
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        """
+        Speak just enough SMTP for smtplib: EHLO, AUTH, MAIL, RCPT, DATA and QUIT.
+        """
+        self.wfile.write(b"220 trellomize-sink\r\n")
+        recipients: List[str] = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip().upper()
+            if command.startswith('EHLO'):
+                self.wfile.write(b"250-trellomize-sink\r\n250 AUTH PLAIN\r\n")
+            elif command.startswith('AUTH'):
+                self.wfile.write(b"235 Authentication successful\r\n")
+            elif command.startswith('RCPT'):
+                recipients.append(line.decode('utf-8').split(':', 1)[1].strip().strip('<>'))
+                self.wfile.write(b"250 OK\r\n")
+            elif command == 'DATA':
+                self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                message = b''.join(iter(self.rfile.readline, b".\r\n")).decode('utf-8', 'replace')
+                code = re.search(r"verification code is: (\d+)", message)
+                with self.server.received:
+                    for recipient in recipients:
+                        self.server.codes[recipient] = code.group(1) if code else ''
+                    self.server.received.notify_all()
+                recipients = []
+                self.wfile.write(b"250 OK\r\n")
+            elif command == 'QUIT':
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 OK\r\n")
+
+
+def find_widget(widgets: Any, label: str) -> Any:
+    """
+    Returns the first AppTest widget with the given label.
+    """
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"No widget labelled '{label}'")
+
+
+def forget_stale_widgets(at: Any) -> None:
+    """
+    AppTest keeps the elements of a run interrupted by st.rerun, although their widget state
+    is gone; reading them on the next run fails. Give such widgets an explicit empty value.
+    """
+    for element_type in ('button', 'checkbox', 'text_input', 'text_area', 'selectbox', 'multiselect', 'number_input', 'date_input'):
+        for widget in at.get(element_type):
+            try:
+                widget.value
+            except KeyError:
+                widget.set_value(False if element_type in ('button', 'checkbox') else None)
+
+
+def io_counters() -> Tuple[int, int]:
+    """
+    Returns the bytes read and written by this process so far, from /proc on Linux.
+    """
+    try:
+        with open('/proc/self/io') as file:
+            counters = dict(line.split(': ') for line in file.read().splitlines())
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError):
+        return 0, 0
+
+
+def init_load_worker(data_dir: str) -> None:
+    """
+    Prepares a load-test worker: shared data directory, quiet logs and a private SMTP sink.
+    """
+    import logging
+    from loguru import logger
+
+    global SINK
+    os.chdir(data_dir)
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    logger.remove()  # Keep the action log file, drop the console output
+    SINK = SMTPSink()
+    threading.Thread(target=SINK.serve_forever, daemon=True).start()
+    os.environ.update({'TRELLOMIZE_SMTP_HOST': '127.0.0.1', 'TRELLOMIZE_SMTP_PORT': str(SINK.server_address[1]), 'TRELLOMIZE_SMTP_SSL': '0'})
+
+
+class LostUpdate(Exception):
+    """
+    Raised by a simulated step when data the session saved earlier (a user, project or task)
+    is gone from the database because another session overwrote it with an older copy.
+    """
+    def __init__(self, kind: str) -> None:
+        super().__init__(f"{kind} lost")
+        self.kind = kind
+
+
+def simulate_session(name: str) -> Dict[str, Any]:
+    """
+    Drives one user through register -> login -> Create Project -> Create Task -> View Tasks
+    -> Edit Task -> add comment with Streamlit's AppTest. When another session overwrote the
+    user, project or task created earlier, the loss is recorded and the flow creates it again
+    and carries on, so every session measures a complete flow.
+
+    Args:
+        name (str): Unique name for the simulated user.
+
+    Returns:
+        Dict[str, Any]: Latency of every step in seconds, the users, projects and tasks lost
+        and created again during the flow, the data the session saved and expects to find in
+        the database, I/O counters and any error.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    latencies: List[Tuple[str, float]] = []
+    lost = {'users': 0, 'projects': 0, 'tasks': 0}
+    read_before, written_before = io_counters()
+
+    def step(step_name: str, action: Any) -> None:
+        start = time.perf_counter()
+        action.run()
+        latencies.append((step_name, time.perf_counter() - start))
+        if at.exception:
+            if at.exception[0].message == repr(name):
+                raise LostUpdate('users')  # The logged in user's record is gone
+            raise RuntimeError(f"{step_name}: {at.exception[0].message}")
+        forget_stale_widgets(at)
+
+    def errors() -> List[str]:
+        return [element.value for element in at.error] + [element.value for element in at.sidebar.error]
+
+    at = AppTest.from_file(APP_FILE, default_timeout=60)
+    email = f"{name}@example.com"
+    project_id = f"{name}-project"
+    task_title, comment = f"{name} task (edited)", f"{name} was here"
+    expected: Dict[str, str] = {}
+
+    def register() -> None:
+        if at.session_state['logged_in']:
+            at.session_state['logged_in'] = False  # Log out the user that was lost
+        step('open register', at.sidebar.selectbox[0].set_value('Register'))
+        find_widget(at.sidebar.text_input, 'Email').set_value(email)
+        find_widget(at.sidebar.text_input, 'Username').set_value(name)
+        find_widget(at.sidebar.text_input, 'Password').set_value('password')
+        step('send verification code', find_widget(at.sidebar.button, 'Send Verification Code').click())
+        find_widget(at.sidebar.text_input, 'Enter the verification code sent to your email').set_value(SINK.wait_for_code(email))
+        step('register', find_widget(at.sidebar.button, 'Verify and Register').click())
+        expected['user'] = name
+
+    def login() -> None:
+        step('open login', at.sidebar.selectbox[0].set_value('Login'))
+        find_widget(at.sidebar.text_input, 'Username').set_value(name)
+        find_widget(at.sidebar.text_input, 'Password').set_value('password')
+        step('login', find_widget(at.sidebar.button, 'Login').click())
+        if "Error: Username does not exist!" in errors():
+            raise LostUpdate('users')
+
+    def create_project() -> None:
+        step('open create project', find_widget(at.sidebar.selectbox, 'User Actions').set_value('Create Project'))
+        find_widget(at.text_input, 'Enter project ID').set_value(project_id)
+        find_widget(at.text_input, 'Enter project title').set_value(f"{name} project")
+        step('create project', find_widget(at.button, 'Create Project').click())
+
+    def create_task() -> None:
+        step('open create task', find_widget(at.sidebar.selectbox, 'User Actions').set_value('Create Task'))
+        find_widget(at.text_input, 'Enter project ID to add task').set_value(project_id)
+        find_widget(at.text_input, 'Enter task title').set_value(f"{name} task")
+        step('create task', find_widget(at.button, 'Create Task').click())
+        if "Error: Project ID not found!" in errors():
+            raise LostUpdate('projects')
+
+    def edit_task() -> None:
+        step('open view tasks', find_widget(at.sidebar.selectbox, 'User Actions').set_value('View Tasks'))
+        at.text_input(key='project_id_input').set_value(project_id)
+        step('view tasks', find_widget(at.button, 'View Tasks').click())
+        if "Error: Project ID not found!" in errors():
+            raise LostUpdate('projects')
+        if not [button for button in at.button if button.label == 'Edit Task']:
+            raise LostUpdate('tasks')
+        step('open edit task', find_widget(at.button, 'Edit Task').click())
+        if "Error: Task ID not found!" in errors():
+            raise LostUpdate('tasks')
+        find_widget(at.text_input, 'Task title').set_value(task_title)
+        step('edit task', find_widget(at.button, 'Update Task').click())
+        if "Error: Task ID not found!" in errors():
+            raise LostUpdate('tasks')
+        expected['task'] = task_title
+
+    def add_comment() -> None:
+        if not [button for button in at.button if button.label == 'View Details']:
+            raise LostUpdate('tasks')
+        step('open task details', find_widget(at.button, 'View Details').click())
+        if "Error: Task ID not found!" in errors():
+            raise LostUpdate('tasks')
+        find_widget(at.text_input, 'Enter your comment').set_value(comment)
+        step('add comment', find_widget(at.button, 'Add Comment').click())
+        expected['comment'] = comment
+
+    flow = [register, login, create_project, create_task, edit_task, add_comment]
+    # Where to pick the flow up again after losing a user, project or task
+    restart = {'users': flow.index(register), 'projects': flow.index(create_project), 'tasks': flow.index(create_task)}
+    error = None
+    try:
+        step('open', at)
+        index = 0
+        while index < len(flow):
+            try:
+                flow[index]()
+                index += 1
+            except LostUpdate as e:
+                lost[e.kind] += 1
+                if sum(lost.values()) > MAX_LOST_PER_SESSION:
+                    raise RuntimeError(f"Gave up after losing {sum(lost.values())} updates") from e
+                index = restart[e.kind]
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    read_after, written_after = io_counters()
+    return {'latencies': latencies, 'lost': lost, 'expected': expected, 'read': read_after - read_before, 'written': written_after - written_before, 'error': error}
+
+
+def count_lost_updates(data_dir: str, results: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Counts the users, tasks and comments that sessions saved but that are missing from the final
+    database, i.e. that another session overwrote with an older copy of the data.
+    """
+    with open(os.path.join(data_dir, 'users.json')) as file:
+        users = json.load(file)
+    titles = set()
+    comments = set()
+    for user in users.values():
+        for project in user['projects']['managed']:
+            for task in project['tasks']:
+                titles.add(task['title'])
+                comments.update(comment for _, _, comment in task['comments'])
+
+    lost = {'users': 0, 'tasks': 0, 'comments': 0}
+    for result in results:
+        expected = result['expected']
+        lost['users'] += 'user' in expected and expected['user'] not in users
+        lost['tasks'] += 'task' in expected and expected['task'] not in titles
+        lost['comments'] += 'comment' in expected and expected['comment'] not in comments
+    return lost
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def load_report(levels: List[int], sessions_per_worker: int) -> None:
+    """
+    Runs the simulated sessions at increasing concurrency and prints throughput, tail
+    latency, lost updates and I/O volume for each level. Every level starts from an
+    empty database in a temporary directory. Lost updates are counted twice: the users,
+    projects and tasks sessions found missing and created again during their flow, and
+    the users, tasks and comments missing from the final database.
+
+    Args:
+        levels (List[int]): Numbers of concurrent worker processes to try.
+        sessions_per_worker (int): Sessions every worker runs one after another.
+
+    Returns:
+        None
+    """
+    print(f"{'workers':>7} {'sessions':>8} {'errors':>6} {'flows/s':>8} {'steps/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'redone u/p/t':>12} {'lost u/t/c':>11} {'MB read':>8} {'MB written':>10}")
+    for level in levels:
+        with tempfile.TemporaryDirectory() as data_dir:
+            names = [f"load{level}_{index}" for index in range(level * sessions_per_worker)]
+            start = time.perf_counter()
+            # AppTest replaces sys.modules['__main__'] with the app, so workers look the functions up by module name
+            import benchmark
+            with ProcessPoolExecutor(max_workers=level, initializer=benchmark.init_load_worker, initargs=(data_dir,)) as pool:
+                results = list(pool.map(benchmark.simulate_session, names))
+            elapsed = time.perf_counter() - start
+
+            completed = [result for result in results if not result['error']]
+            latencies = [latency for result in results for _, latency in result['latencies']]
+            redone = {kind: sum(result['lost'][kind] for result in results) for kind in ('users', 'projects', 'tasks')}
+            lost = count_lost_updates(data_dir, results) if os.path.exists(os.path.join(data_dir, 'users.json')) else {'users': 0, 'tasks': 0, 'comments': 0}
+            print(f"{level:>7} {len(results):>8} {len(results) - len(completed):>6} {len(completed) / elapsed:>8.2f} {len(latencies) / elapsed:>8.1f} "
+                  f"{percentile(latencies, 0.5) * 1000 if latencies else 0:>8.0f} {percentile(latencies, 0.95) * 1000 if latencies else 0:>8.0f} "
+                  f"{percentile(latencies, 0.99) * 1000 if latencies else 0:>8.0f} {redone['users']:>4}/{redone['projects']}/{redone['tasks']:<5} "
+                  f"{lost['users']:>3}/{lost['tasks']}/{lost['comments']:<5} "
+                  f"{sum(result['read'] for result in results) / 1e6:>8.1f} {sum(result['written'] for result in results) / 1e6:>10.1f}")
+            for error in sorted({result['error'] for result in results if result['error']}):
+                print(f"        error: {error}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the command line parser for the benchmarks.
+
+    Args:
+        None
+
+    Returns:
+        argparse.ArgumentParser: The parser with one subparser per benchmark.
+    """
+    parser = argparse.ArgumentParser(description='Trellomize Benchmarks')
+    subparsers = parser.add_subparsers(dest='command')
+
+    # Subparser for the cold-start report
+    startup_parser = subparsers.add_parser('startup')
+    startup_parser.add_argument('--module', default='main', help='Module to import')
+    startup_parser.add_argument('--runs', type=int, default=5, help='Number of fresh interpreters to start')
+    startup_parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to list')
+
+    # Subparser for the concurrent user simulation
+    load_parser = subparsers.add_parser('load')
+    load_parser.add_argument('--concurrency', default='1,2,4,8', help='Comma-separated numbers of concurrent worker processes')
+    load_parser.add_argument('--sessions', type=int, default=5, help='Sessions per worker at each concurrency level')
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Parses the command line and runs the requested benchmark.
+
+    Args:
+        argv (Optional[List[str]]): Arguments to parse, defaults to sys.argv.
+
+    Returns:
+        None
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.command == 'startup':
+        startup_report(args.module, args.runs, args.top)
+    elif args.command == 'load':
+        load_report([int(level) for level in args.concurrency.split(',')], args.sessions)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,42 @@
 import streamlit as st
 import uuid
+import heapq
 import os
+import stat
 import json
+import html
+import threading
+import time
+import sqlite3
+import tempfile
+import zlib
+from collections import OrderedDict
+from contextlib import closing
 from enum import Enum
-from datetime import datetime
-from typing import Dict, Optional, List, Tuple, Union, Any
-import bcrypt
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, List, Set, Tuple, Union, Any
 from loguru import logger
-import smtplib
-import ssl
 import random
-from email.message import EmailMessage
 
 DATABASE_FILE = 'users.json'
+ACTIVITY_DATABASE_FILE = 'activity.db'
+ARCHIVE_DATABASE_FILE = 'archive.db'
+ARCHIVE_DONE_AFTER_DAYS = 30  # DONE tasks finished longer ago than this are moved to the archive
+CHANGE_POLL_SECONDS = 5  # How often open task lists check for changes made by others
+RETENTION_MODES = ("summarize", "archive")  # What happens to history and comments beyond a project's retention policy
 LOG_FILE = 'user_actions.log'
-
-# Set up the logger
-logger.add(LOG_FILE, rotation="500 MB")  # Rotates the log file after reaching 500 MB
+# Mail server for verification emails, overridable so tests can point at a local server
+SMTP_HOST = os.environ.get('TRELLOMIZE_SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.environ.get('TRELLOMIZE_SMTP_PORT', '465'))
+SMTP_USE_SSL = os.environ.get('TRELLOMIZE_SMTP_SSL', '1') == '1'
+
+# Set up the logger once per process; Streamlit re-executes this script on every rerun
+@st.cache_resource
+def setup_logging() -> int:
+    """
+    Add the action log file sink and return its handler ID.
+    """
+    return logger.add(LOG_FILE, rotation="500 MB")  # Rotates the log file after reaching 500 MB
 
 # Enum for task priority levels
 class Priority(Enum):
@@ -56,6 +76,7 @@ class Task:
         self.status: Status = Status.BACKLOG  # Set default status to BACKLOG
         self.history: List[Tuple[datetime, str]] = []  # Initialize history list
         self.comments: List[Tuple[datetime, str, str]] = []  # Initialize comments list
+        self.blocked_by: List[str] = []  # IDs of tasks that must finish before this one
 
     def change_status(self, new_status: Status) -> None:
         """
@@ -96,7 +117,8 @@ class Task:
             "priority": self.priority.name,  # Convert priority to its name as a string
             "status": self.status.name,  # Convert status to its name as a string
             "history": [(time.isoformat(), change) for time, change in self.history],
-            "comments": [(time.isoformat(), user, comment) for time, user, comment in self.comments]
+            "comments": [(time.isoformat(), user, comment) for time, user, comment in self.comments],
+            "blocked_by": self.blocked_by
         }
 
     def __repr__(self) -> str:
@@ -106,6 +128,318 @@ class Task:
         return f"Task ID: {self.id}, Title: {self.title}, Status: {self.status.name}"
 
 
+_version_lock = threading.Lock()
+_last_version = 0
+
+
+def new_version(previous: int = 0) -> int:
+    """
+    Return a project version greater than previous and than any version handed out before.
+    Versions are nanosecond timestamps, so a project that is deleted and created again under
+    the same ID never reuses an old version, not even one from another process.
+    """
+    global _last_version
+    with _version_lock:
+        _last_version = max(time.time_ns(), previous + 1, _last_version + 1)
+        return _last_version
+
+
+def touch_project(project: Dict[str, Any]) -> int:
+    """
+    Give a project a new version after it changed and return the new version.
+    """
+    project['version'] = new_version(project.get('version', 0))
+    return project['version']
+
+
+def task_duration(task: Dict[str, Any]) -> float:
+    """
+    Return the planned duration of a task dictionary in seconds (never negative).
+    """
+    start, end = task['start_time'], task['end_time']
+    if isinstance(start, str):
+        start = datetime.fromisoformat(start)
+    if isinstance(end, str):
+        end = datetime.fromisoformat(end)
+    return max((end - start).total_seconds(), 0.0)
+
+
+# Class to represent the blocked-by/blocks relationships between the tasks of a project
+class TaskGraph:
+    def __init__(self) -> None:
+        """
+        Create an empty dependency graph. An edge blocker -> task means the
+        blocker has to finish before the task can start.
+        """
+        self.blockers: Dict[str, set] = {}  # task -> tasks it is blocked by
+        self.dependents: Dict[str, set] = {}  # task -> tasks it blocks
+        self.durations: Dict[str, float] = {}
+        self.order: List[Optional[str]] = []  # Topological order, None marks a removed task
+        self.position: Dict[str, int] = {}  # task -> index in self.order
+        self.finish: Dict[str, float] = {}  # Earliest finish of each task, relative to the project start
+        self.critical_parent: Dict[str, Optional[str]] = {}  # Blocker that determines the earliest start
+
+    @classmethod
+    def from_tasks(cls, tasks: List[Dict[str, Any]]) -> "TaskGraph":
+        """
+        Build the graph for a project's task list in a single pass. References to
+        unknown tasks are ignored. Raises ValueError if the stored dependencies contain a cycle.
+        """
+        graph = cls()
+        for task in tasks:
+            graph.blockers[task['id']] = set()
+            graph.dependents[task['id']] = set()
+            graph.durations[task['id']] = task_duration(task)
+        for task in tasks:
+            for blocker_id in task.get('blocked_by', []):
+                if blocker_id in graph.blockers and blocker_id != task['id']:
+                    graph.blockers[task['id']].add(blocker_id)
+                    graph.dependents[blocker_id].add(task['id'])
+
+        # Kahn's algorithm gives the initial topological order
+        in_degree = {task_id: len(blockers) for task_id, blockers in graph.blockers.items()}
+        ready = [task_id for task_id, degree in in_degree.items() if degree == 0]
+        while ready:
+            task_id = ready.pop()
+            graph.position[task_id] = len(graph.order)
+            graph.order.append(task_id)
+            for dependent_id in graph.dependents[task_id]:
+                in_degree[dependent_id] -= 1
+                if in_degree[dependent_id] == 0:
+                    ready.append(dependent_id)
+        if len(graph.order) != len(graph.blockers):
+            raise ValueError("Task dependencies contain a cycle")
+
+        graph._reschedule(graph.order)
+        return graph
+
+    def add_task(self, task_id: str, duration: float = 0.0) -> None:
+        """
+        Add a task without dependencies to the graph.
+        """
+        if task_id in self.position:
+            return
+        self.blockers[task_id] = set()
+        self.dependents[task_id] = set()
+        self.durations[task_id] = duration
+        self.position[task_id] = len(self.order)
+        self.order.append(task_id)
+        self._reschedule([task_id])
+
+    def remove_task(self, task_id: str) -> None:
+        """
+        Remove a task and all of its dependency edges from the graph.
+        """
+        dependents = self.dependents.pop(task_id)
+        for blocker_id in self.blockers.pop(task_id):
+            self.dependents[blocker_id].discard(task_id)
+        for dependent_id in dependents:
+            self.blockers[dependent_id].discard(task_id)
+        self.order[self.position.pop(task_id)] = None
+        del self.durations[task_id], self.finish[task_id], self.critical_parent[task_id]
+        self._reschedule(dependents)
+
+    def set_duration(self, task_id: str, duration: float) -> None:
+        """
+        Change the duration of a task and update the schedule of its downstream tasks.
+        """
+        self.durations[task_id] = duration
+        self._reschedule([task_id])
+
+    def add_dependency(self, task_id: str, blocker_id: str) -> None:
+        """
+        Record that task_id is blocked by blocker_id. Raises ValueError if this would create a cycle.
+        """
+        if blocker_id == task_id:
+            raise ValueError("A task cannot block itself")
+        if blocker_id in self.blockers[task_id]:
+            return
+        self._reorder(blocker_id, task_id)
+        self.blockers[task_id].add(blocker_id)
+        self.dependents[blocker_id].add(task_id)
+        self._reschedule([task_id])
+
+    def remove_dependency(self, task_id: str, blocker_id: str) -> None:
+        """
+        Remove the blocked-by relationship between two tasks.
+        """
+        if blocker_id in self.blockers[task_id]:
+            self.blockers[task_id].remove(blocker_id)
+            self.dependents[blocker_id].remove(task_id)
+            self._reschedule([task_id])
+
+    def set_dependencies(self, task_id: str, blocker_ids: List[str]) -> None:
+        """
+        Replace the blockers of a task. The graph is left unchanged if the new blockers would create a cycle.
+        """
+        current = set(self.blockers[task_id])
+        removed = current - set(blocker_ids)
+        added: List[str] = []
+        for blocker_id in removed:
+            self.remove_dependency(task_id, blocker_id)
+        try:
+            for blocker_id in blocker_ids:
+                if blocker_id not in current:
+                    self.add_dependency(task_id, blocker_id)
+                    added.append(blocker_id)
+        except ValueError:
+            for blocker_id in added:
+                self.remove_dependency(task_id, blocker_id)
+            for blocker_id in removed:
+                self.add_dependency(task_id, blocker_id)
+            raise
+
+    def topological_order(self) -> List[str]:
+        """
+        Return the task IDs so that every task comes after all of its blockers.
+        """
+        return [task_id for task_id in self.order if task_id is not None]
+
+    def critical_path(self) -> List[str]:
+        """
+        Return the longest chain of dependent tasks, from the first task to the last one to finish.
+        """
+        if not self.finish:
+            return []
+        task_id: Optional[str] = max(self.finish, key=self.finish.__getitem__)
+        path = []
+        while task_id is not None:
+            path.append(task_id)
+            task_id = self.critical_parent[task_id]
+        path.reverse()
+        return path
+
+    def _reorder(self, blocker_id: str, task_id: str) -> None:
+        """
+        Restore the topological order before adding the edge blocker_id -> task_id
+        (Pearce-Kelly). Only tasks positioned between the two endpoints are visited.
+        """
+        lower, upper = self.position[task_id], self.position[blocker_id]
+        if lower > upper:
+            return
+
+        forward, stack = [], [task_id]
+        seen = {task_id}
+        while stack:
+            current = stack.pop()
+            forward.append(current)
+            for dependent_id in self.dependents[current]:
+                if dependent_id == blocker_id:
+                    raise ValueError("Dependency would create a cycle")
+                if dependent_id not in seen and self.position[dependent_id] < upper:
+                    seen.add(dependent_id)
+                    stack.append(dependent_id)
+
+        backward, stack = [], [blocker_id]
+        seen = {blocker_id}
+        while stack:
+            current = stack.pop()
+            backward.append(current)
+            for other_blocker_id in self.blockers[current]:
+                if other_blocker_id not in seen and self.position[other_blocker_id] > lower:
+                    seen.add(other_blocker_id)
+                    stack.append(other_blocker_id)
+
+        backward.sort(key=self.position.__getitem__)
+        forward.sort(key=self.position.__getitem__)
+        affected = backward + forward
+        for slot, moved_id in zip(sorted(self.position[moved] for moved in affected), affected):
+            self.order[slot] = moved_id
+            self.position[moved_id] = slot
+
+    def _reschedule(self, changed: List[str]) -> None:
+        """
+        Recompute earliest finish times for the changed tasks and, where their finish
+        moved, for the tasks downstream of them. Tasks are processed in topological order.
+        """
+        heap = [(self.position[task_id], task_id) for task_id in changed if task_id in self.position]
+        heapq.heapify(heap)
+        queued = {task_id for _, task_id in heap}
+        while heap:
+            _, task_id = heapq.heappop(heap)
+            queued.discard(task_id)
+            start, parent = 0.0, None
+            for blocker_id in self.blockers[task_id]:
+                if self.finish[blocker_id] > start or parent is None:
+                    start, parent = max(start, self.finish[blocker_id]), blocker_id
+            finish = start + self.durations[task_id]
+            self.critical_parent[task_id] = parent
+            if self.finish.get(task_id) == finish:
+                continue
+            self.finish[task_id] = finish
+            for dependent_id in self.dependents[task_id]:
+                if dependent_id not in queued:
+                    queued.add(dependent_id)
+                    heapq.heappush(heap, (self.position[dependent_id], dependent_id))
+
+
+# Class to keep the dependency graphs of recently viewed projects between reruns
+class TaskGraphCache:
+    def __init__(self, max_size: int = 64) -> None:
+        """
+        Create an empty cache holding the graphs of at most max_size projects, each
+        together with the project version it reflects.
+        """
+        self.max_size = max_size
+        self.graphs: "OrderedDict[Tuple[str, str], Tuple[int, TaskGraph]]" = OrderedDict()
+        self.lock = threading.RLock()  # Held while a shared graph is read or changed
+
+    def get(self, owner: str, project: Dict[str, Any]) -> TaskGraph:
+        """
+        Return the graph of the project at its current version, building it on a miss.
+        Raises ValueError if the stored dependencies contain a cycle.
+        """
+        key, version = (owner, project['id']), project.get('version', 0)
+        with self.lock:
+            cached = self.graphs.get(key)
+            if cached is not None and cached[0] == version:
+                self.graphs.move_to_end(key)
+                return cached[1]
+        graph = TaskGraph.from_tasks(project['tasks'])
+        if cached is None or cached[0] < version:  # A session with stale data must not replace a newer graph
+            self.put(owner, project, graph)
+        return graph
+
+    def put(self, owner: str, project: Dict[str, Any], graph: TaskGraph) -> None:
+        """
+        Store a graph as the one of the project at its current version, e.g. after it was
+        changed incrementally along with the project.
+        """
+        with self.lock:
+            self.graphs[(owner, project['id'])] = (project.get('version', 0), graph)
+            self.graphs.move_to_end((owner, project['id']))
+            while len(self.graphs) > self.max_size:
+                self.graphs.popitem(last=False)
+
+
+@st.cache_resource
+def get_task_graphs() -> TaskGraphCache:
+    """
+    Return the process-wide cache of dependency graphs, which survives reruns.
+    """
+    return TaskGraphCache()
+
+
+def replace_file(temp_file: str, path: str) -> None:
+    """
+    Atomically replace path with temp_file. Temporary files are created owner-only, so the
+    replacement gets the mode of the file it replaces, or the umask default for a new file.
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        # os.umask can only be read by changing it for every thread of the process,
+        # so let the kernel apply it to a file created with the default mode instead
+        probe = temp_file + '.mode'
+        os.close(os.open(probe, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+        try:
+            mode = stat.S_IMODE(os.stat(probe).st_mode)
+        finally:
+            os.remove(probe)
+    os.chmod(temp_file, mode)
+    os.replace(temp_file, path)
+
+
 class UserDatabase:
     @staticmethod
     def load_users() -> Dict[str, Dict]:
@@ -122,12 +456,7 @@ class UserDatabase:
                 for user in users.values():
                     for project in user.get('projects', {}).get('managed', []):
                         for task in project.get('tasks', []):
-                            task['status'] = Status[task['status']]
-                            task['priority'] = task['priority']  # Ensure priority is a string
-                            task['start_time'] = datetime.fromisoformat(task['start_time'])
-                            task['end_time'] = datetime.fromisoformat(task['end_time'])
-                            task['history'] = [(datetime.fromisoformat(time), change) for time, change in task['history']]
-                            task['comments'] = [(datetime.fromisoformat(time), user, comment) for time, user, comment in task['comments']]
+                            UserDatabase.deserialize_task(task)
                 return users
         except FileNotFoundError:
             logger.error("Database file not found!")
@@ -139,20 +468,500 @@ class UserDatabase:
             logger.error(f"Error: {e}")
             return {}
 
+    @staticmethod
+    def deserialize_task(task: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert a task loaded from JSON in place: status to an Enum and timestamps to datetime objects.
+        """
+        task['status'] = Status[task['status']]
+        task['priority'] = task['priority']  # Ensure priority is a string
+        task['start_time'] = datetime.fromisoformat(task['start_time'])
+        task['end_time'] = datetime.fromisoformat(task['end_time'])
+        # Change feed snapshots carry no history or comments
+        if 'history' in task:
+            task['history'] = [(datetime.fromisoformat(time), change) for time, change in task['history']]
+        if 'comments' in task:
+            task['comments'] = [(datetime.fromisoformat(time), user, comment) for time, user, comment in task['comments']]
+        task.setdefault('blocked_by', [])  # Older databases have no dependencies
+        return task
+
+    @staticmethod
+    def serialize(obj: Any) -> str:
+        """
+        JSON fallback that turns Enums and datetime objects into strings.
+        """
+        if isinstance(obj, (Status, Priority)):
+            return obj.name
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        raise TypeError("Type not serializable")
+
     @staticmethod
     def save_users(users: Dict[str, Dict]) -> None:
         """
         Save users to the database file. Serialize Enums and datetime objects to JSON-compatible formats.
         """
-        def serialize(obj):
-            if isinstance(obj, (Status, Priority)):
-                return obj.name
-            if isinstance(obj, datetime):
-                return obj.isoformat()
-            raise TypeError("Type not serializable")
+        # Write to a temporary file and swap it in, so a batch of changes is persisted all at once.
+        # Every write gets its own temporary file, as several sessions or processes may save at the same time.
+        file_descriptor, temp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(DATABASE_FILE)), suffix='.tmp')
+        with os.fdopen(file_descriptor, 'w') as file:
+            json.dump(users, file, indent=4, default=UserDatabase.serialize)
+        replace_file(temp_file, DATABASE_FILE)
+
+
+class ActivityLog:
+    """
+    Global, time-ordered log of project and task events, stored in SQLite next to the
+    users database. Project IDs are only unique per owner, so events are keyed by
+    (owner, project ID). Indexes on (owner, project, timestamp) and (user, timestamp)
+    let the activity feed read only the requested time window. Event IDs increase with every
+    change, so they double as a change feed: the last event of each task in a write
+    carries a snapshot of the task, and open pages ask for the changes after the last
+    ID they have seen.
+    """
+    SCHEMA = """
+        PRAGMA journal_mode = WAL;  -- Readers, such as snapshot backups, do not block writers
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            owner TEXT,
+            project_id TEXT NOT NULL,
+            task_id TEXT,
+            user TEXT NOT NULL,
+            action TEXT NOT NULL,
+            snapshot TEXT
+        );
+        CREATE TABLE IF NOT EXISTS visits (
+            user TEXT PRIMARY KEY,
+            timestamp TEXT NOT NULL
+        );
+    """
+    INDEXES = """
+        DROP INDEX IF EXISTS events_project_time;
+        CREATE INDEX IF NOT EXISTS events_owner_project_time ON events (owner, project_id, timestamp, id);
+        CREATE INDEX IF NOT EXISTS events_user_time ON events (user, timestamp, id);
+    """
+
+    ready: Set[str] = set()  # Database files whose schema was set up by this process
+
+    @staticmethod
+    def connect() -> sqlite3.Connection:
+        """
+        Open the activity database. The tables and indexes are created, and older logs
+        migrated, on the first connection of the process only.
+        """
+        connection = sqlite3.connect(ACTIVITY_DATABASE_FILE)
+        connection.row_factory = sqlite3.Row
+        if os.path.abspath(ACTIVITY_DATABASE_FILE) not in ActivityLog.ready:
+            connection.executescript(ActivityLog.SCHEMA)
+            # Logs created before task snapshots or project owners were recorded lack the columns.
+            # Their old events have no owner and no longer show up in project feeds.
+            columns = {row["name"] for row in connection.execute("PRAGMA table_info(events)")}
+            for column in ("snapshot", "owner"):
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE events ADD COLUMN {column} TEXT")
+            connection.executescript(ActivityLog.INDEXES)
+            ActivityLog.ready.add(os.path.abspath(ACTIVITY_DATABASE_FILE))
+        return connection
+
+    @staticmethod
+    def record(owner: str, project_id: str, user: str, action: str, task: Optional[Dict[str, Any]] = None, timestamp: Optional[datetime] = None) -> None:
+        """
+        Append a single event to the log of the owner's project. Task events pass the task as changed.
+        """
+        ActivityLog.record_many([(owner, project_id, user, action, task)], timestamp)
+
+    @staticmethod
+    def record_many(events: List[Tuple[str, str, str, str, Optional[Dict[str, Any]]]], timestamp: Optional[datetime] = None) -> None:
+        """
+        Append several (owner, project_id, user, action, task) events in one transaction.
+        A task changed by several events is only snapshotted once, on its last event.
+        """
+        moment = (timestamp or datetime.now()).isoformat(timespec="microseconds")
+        last_event = {task['id']: index for index, (*_, task) in enumerate(events) if task}
+        rows = [
+            (moment, owner, project_id, user, action, task['id'] if task else None,
+             ActivityLog.snapshot(task) if task and last_event[task['id']] == index else None)
+            for index, (owner, project_id, user, action, task) in enumerate(events)
+        ]
+        with closing(ActivityLog.connect()) as connection, connection:
+            connection.executemany("INSERT INTO events (timestamp, owner, project_id, user, action, task_id, snapshot) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    @staticmethod
+    def snapshot(task: Dict[str, Any]) -> str:
+        """
+        Serialize the fields of a task that task lists show. History and comments are left
+        out; pages that show them read the users database.
+        """
+        return json.dumps({key: value for key, value in task.items() if key not in ("history", "comments", "history_summary")}, default=UserDatabase.serialize)
+
+    @staticmethod
+    def latest_id() -> int:
+        """
+        Return the ID of the newest event, or 0 if the log is empty.
+        """
+        with closing(ActivityLog.connect()) as connection:
+            return connection.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    @staticmethod
+    def changes_since(projects: List[Tuple[str, str]], after_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Return the events of the given (owner, project ID) pairs with an ID greater than after_id,
+        oldest first. Events carrying a task snapshot include it, without history and comments, under 'task'.
+        """
+        if not projects:
+            return []
+        sql = ("SELECT id, owner, project_id, task_id, action, snapshot FROM events WHERE id > ? AND ("
+               + " OR ".join("(owner = ? AND project_id = ?)" for _ in projects) + ") ORDER BY id LIMIT ?")
+        with closing(ActivityLog.connect()) as connection:
+            rows = connection.execute(sql, [after_id] + [value for project in projects for value in project] + [limit]).fetchall()
+        return [
+            {"id": row["id"], "owner": row["owner"], "project_id": row["project_id"], "task_id": row["task_id"], "action": row["action"],
+             "task": UserDatabase.deserialize_task(json.loads(row["snapshot"])) if row["snapshot"] else None}
+            for row in rows
+        ]
+
+    @staticmethod
+    def query(projects: Optional[List[Tuple[str, str]]] = None, user: Optional[str] = None, since: Optional[datetime] = None,
+              until: Optional[datetime] = None, cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Return one page of events, newest first, for the given (owner, project ID) pairs or user within [since, until).
+        The returned cursor fetches the next (older) page and is None when there are no more events.
+        """
+        conditions, params = [], []
+        if projects is not None:
+            if not projects:
+                return [], None
+            conditions.append("(" + " OR ".join("(owner = ? AND project_id = ?)" for _ in projects) + ")")
+            params += [value for project in projects for value in project]
+        if user is not None:
+            conditions.append("user = ?")
+            params.append(user)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since.isoformat(timespec="microseconds"))
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until.isoformat(timespec="microseconds"))
+        if cursor:
+            cursor_time, cursor_id = cursor.rsplit("|", 1)
+            conditions.append("(timestamp, id) < (?, ?)")
+            params += [cursor_time, int(cursor_id)]
+
+        sql = "SELECT id, timestamp, owner, project_id, task_id, user, action FROM events"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        with closing(ActivityLog.connect()) as connection:
+            rows = connection.execute(sql, params + [limit + 1]).fetchall()
+
+        events = [dict(row, timestamp=datetime.fromisoformat(row["timestamp"])) for row in rows[:limit]]
+        next_cursor = f"{rows[limit - 1]['timestamp']}|{rows[limit - 1]['id']}" if len(rows) > limit else None
+        return events, next_cursor
+
+    @staticmethod
+    def last_visit(user: str) -> Optional[datetime]:
+        """
+        Return when the user last opened the activity feed, or None for a first visit.
+        """
+        with closing(ActivityLog.connect()) as connection:
+            row = connection.execute("SELECT timestamp FROM visits WHERE user = ?", (user,)).fetchone()
+        return datetime.fromisoformat(row["timestamp"]) if row else None
+
+    @staticmethod
+    def mark_visit(user: str, timestamp: Optional[datetime] = None) -> None:
+        """
+        Remember the time of the user's current visit to the activity feed.
+        """
+        moment = (timestamp or datetime.now()).isoformat(timespec="microseconds")
+        with closing(ActivityLog.connect()) as connection, connection:
+            connection.execute("INSERT OR REPLACE INTO visits (user, timestamp) VALUES (?, ?)", (user, moment))
+
+
+# Class to follow the change feed of a set of projects from one session
+class ChangeSubscription:
+    def __init__(self, projects: List[Tuple[str, str]], after_id: int) -> None:
+        """
+        Subscribe to the (owner, project ID) pairs, starting after the event the session has already seen.
+        """
+        self.projects = projects
+        self.after_id = after_id
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """
+        Return the events published since the last poll.
+        """
+        events = ActivityLog.changes_since(self.projects, self.after_id)
+        if events:
+            self.after_id = events[-1]["id"]
+        return events
+
+
+class TaskArchive:
+    """
+    Cold storage for ARCHIVED tasks and old DONE tasks. Each task is kept as a
+    zlib-compressed JSON blob, with its title and description stored alongside
+    so archived tasks stay searchable without loading them into users.json.
+    """
+    SCHEMA = """
+        PRAGMA journal_mode = WAL;
+        CREATE TABLE IF NOT EXISTS archived_tasks (
+            task_id TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            project_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            status TEXT NOT NULL,
+            archived_at TEXT NOT NULL,
+            payload BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS archived_tasks_project ON archived_tasks (owner, project_id, archived_at);
+        CREATE TABLE IF NOT EXISTS archived_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id TEXT NOT NULL,
+            owner TEXT NOT NULL,
+            project_id TEXT NOT NULL,
+            archived_at TEXT NOT NULL,
+            payload BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS archived_history_task ON archived_history (task_id, id);
+    """
+
+    ready: Set[str] = set()  # Database files whose schema was set up by this process
+
+    @staticmethod
+    def connect() -> sqlite3.Connection:
+        """
+        Open the archive database, creating the tables and indexes on the first connection of the process.
+        """
+        connection = sqlite3.connect(ARCHIVE_DATABASE_FILE)
+        connection.row_factory = sqlite3.Row
+        if os.path.abspath(ARCHIVE_DATABASE_FILE) not in TaskArchive.ready:
+            connection.executescript(TaskArchive.SCHEMA)
+            TaskArchive.ready.add(os.path.abspath(ARCHIVE_DATABASE_FILE))
+        return connection
+
+    @staticmethod
+    def completed_at(task: Dict[str, Any]) -> datetime:
+        """
+        Return when a task was last moved to DONE, falling back to its end time.
+        """
+        for timestamp, change in reversed(task['history']):
+            if change == f"Status changed to {Status.DONE.name}":
+                return datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp
+        return task['end_time']
+
+    @staticmethod
+    def is_archivable(task: Dict[str, Any], now: datetime, done_after_days: int = ARCHIVE_DONE_AFTER_DAYS) -> bool:
+        """
+        Check whether a task is ARCHIVED, or DONE for longer than done_after_days.
+        """
+        if task['status'] == Status.ARCHIVED:
+            return True
+        return task['status'] == Status.DONE and now - TaskArchive.completed_at(task) > timedelta(days=done_after_days)
+
+    @staticmethod
+    def archive_tasks(users: Dict[str, Dict], done_after_days: int = ARCHIVE_DONE_AFTER_DAYS, owner: Optional[str] = None) -> int:
+        """
+        Move archivable tasks out of the managed projects (of one owner, or of everyone) into the
+        archive and save the users database. Return the number of tasks archived.
+        """
+        now = datetime.now()
+        events = []
+        for username, user in users.items():
+            if owner is not None and username != owner:
+                continue
+            for project in user['projects']['managed']:
+                events += TaskArchive.archive(username, project, [task for task in project['tasks'] if TaskArchive.is_archivable(task, now, done_after_days)], now)
+        if not events:
+            return 0
+        UserDatabase.save_users(users)
+        ActivityLog.record_many(events)
+        logger.info(f"Archived {len(events)} tasks")
+        return len(events)
+
+    @staticmethod
+    def archive(owner: str, project: Dict[str, Any], tasks: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Tuple[str, str, str, str, None]]:
+        """
+        Write tasks of a project to the archive and remove them from the project. The users
+        database is not saved: callers save it afterwards, so if saving fails the tasks are
+        duplicated, never lost. Return the activity events to record once the users are saved.
+        """
+        if not tasks:
+            return []
+        now = now or datetime.now()
+        rows = [
+            (task['id'], owner, project['id'], task['title'], task['description'], task['status'].name, now.isoformat(),
+             zlib.compress(json.dumps(task, default=UserDatabase.serialize).encode('utf-8')))
+            for task in tasks
+        ]
+        with closing(TaskArchive.connect()) as connection, connection:
+            connection.executemany("INSERT OR REPLACE INTO archived_tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        archived_ids = {task['id'] for task in tasks}
+        project['tasks'] = [task for task in project['tasks'] if task['id'] not in archived_ids]
+        touch_project(project)
+        return [(owner, project['id'], owner, f"Task '{task['title']}' archived", None) for task in tasks]
 
-        with open(DATABASE_FILE, 'w') as file:
-            json.dump(users, file, indent=4, default=serialize)
+    @staticmethod
+    def search(owner: str, project_id: Optional[str] = None, text: str = "", limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Find archived tasks of an owner's projects whose title or description contains the text.
+        """
+        sql = "SELECT task_id, project_id, title, description, status, archived_at FROM archived_tasks WHERE owner = ?"
+        params: List[Any] = [owner]
+        if project_id:
+            sql += " AND project_id = ?"
+            params.append(project_id)
+        if text:
+            sql += " AND (title LIKE ? OR description LIKE ?)"
+            params += [f"%{text}%", f"%{text}%"]
+        sql += " ORDER BY archived_at DESC LIMIT ?"
+        with closing(TaskArchive.connect()) as connection:
+            return [dict(row) for row in connection.execute(sql, params + [limit])]
+
+    @staticmethod
+    def restore(users: Dict[str, Dict], owner: str, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Move an archived task back into its project and save the users database. An ARCHIVED task
+        gets back the status it had before it was archived, or BACKLOG if that is no longer known.
+        Return the restored task, or None if the task or its project no longer exists.
+        Raise ValueError if the project already has a task with the same ID.
+        """
+        with closing(TaskArchive.connect()) as connection:
+            row = connection.execute("SELECT project_id, payload FROM archived_tasks WHERE task_id = ? AND owner = ?", (task_id, owner)).fetchone()
+            if row is None:
+                return None
+            project = next((project for project in users[owner]['projects']['managed'] if project['id'] == row['project_id']), None)
+            if project is None:
+                return None
+            if any(task['id'] == task_id for task in project['tasks']):
+                raise ValueError(f"Project {project['id']} already has a task with ID {task_id}")
+            task = UserDatabase.deserialize_task(json.loads(zlib.decompress(row['payload'])))
+            if task['status'] == Status.ARCHIVED:
+                # Otherwise the next bulk or API change to the task would archive it again
+                task['status'] = TaskArchive.status_before_archiving(task)
+                task['history'].append((datetime.now(), f"Status changed to {task['status'].name}"))
+            project['tasks'].append(task)
+            touch_project(project)
+            UserDatabase.save_users(users)
+            with connection:
+                connection.execute("DELETE FROM archived_tasks WHERE task_id = ?", (task_id,))
+        logger.info(f"Task {task_id} restored to project {project['id']}")
+        return task
+
+    @staticmethod
+    def status_before_archiving(task: Dict[str, Any]) -> Status:
+        """
+        Return the last status other than ARCHIVED recorded in a task's history, or BACKLOG if there is none.
+        """
+        prefix = "Status changed to "
+        for _, change in reversed(task['history']):
+            name = change[len(prefix):] if change.startswith(prefix) else None
+            if name in Status.__members__ and name != Status.ARCHIVED.name:
+                return Status[name]
+        return Status.BACKLOG
+
+    @staticmethod
+    def archive_history(rows: List[Tuple[str, str, str, List[Tuple], List[Tuple]]]) -> None:
+        """
+        Store old history and comment entries, given as (owner, project ID, task ID, history, comments) rows.
+        """
+        now = datetime.now().isoformat()
+        with closing(TaskArchive.connect()) as connection, connection:
+            connection.executemany(
+                "INSERT INTO archived_history (task_id, owner, project_id, archived_at, payload) VALUES (?, ?, ?, ?, ?)",
+                [(task_id, owner, project_id, now, zlib.compress(json.dumps({"history": history, "comments": comments}, default=UserDatabase.serialize).encode('utf-8')))
+                 for owner, project_id, task_id, history, comments in rows],
+            )
+
+    @staticmethod
+    def archived_history(owner: str, task_id: str) -> Tuple[List[Tuple], List[Tuple]]:
+        """
+        Return the history and comment entries of a task moved to the archive by its project's retention policy, oldest first.
+        """
+        history: List[Tuple] = []
+        comments: List[Tuple] = []
+        with closing(TaskArchive.connect()) as connection:
+            for row in connection.execute("SELECT payload FROM archived_history WHERE task_id = ? AND owner = ? ORDER BY id", (task_id, owner)):
+                entries = json.loads(zlib.decompress(row['payload']))
+                history += [(datetime.fromisoformat(time), change) for time, change in entries['history']]
+                comments += [(datetime.fromisoformat(time), user, comment) for time, user, comment in entries['comments']]
+        return history, comments
+
+
+class HistoryRetention:
+    """
+    Per-project limits on the growth of task history and comments. A project's "retention"
+    policy keeps the last max_entries entries and those newer than max_age_days (0 means no
+    limit). Older entries are counted in the task's "history_summary"; in "archive" mode they
+    are also moved to the archive database, where they can still be read.
+    """
+
+    @staticmethod
+    def policy(max_entries: int = 0, max_age_days: int = 0, mode: str = "summarize") -> Optional[Dict[str, Any]]:
+        """
+        Build a retention policy, or return None if it sets no limit.
+        """
+        if max_entries < 0 or max_age_days < 0:
+            raise ValueError("Retention limits cannot be negative")
+        if mode not in RETENTION_MODES:
+            raise ValueError(f"Invalid retention mode: {mode}")
+        if not max_entries and not max_age_days:
+            return None
+        return {"max_entries": max_entries, "max_age_days": max_age_days, "mode": mode}
+
+    @staticmethod
+    def split(entries: List[Tuple], max_entries: int, cutoff: Optional[datetime]) -> Tuple[List[Tuple], List[Tuple]]:
+        """
+        Split chronological entries into those the policy drops and those it keeps.
+        """
+        first_kept = max(len(entries) - max_entries, 0) if max_entries else 0
+        if cutoff is not None:
+            # Entries are appended in time order, so everything before the first recent one has expired
+            while first_kept < len(entries):
+                timestamp = entries[first_kept][0]
+                if (datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp) >= cutoff:
+                    break
+                first_kept += 1
+        return entries[:first_kept], entries[first_kept:]
+
+    @staticmethod
+    def enforce(owner: str, project: Dict[str, Any], tasks: Optional[List[Dict[str, Any]]] = None, now: Optional[datetime] = None) -> int:
+        """
+        Apply the project's retention policy to some of its tasks (all of them by default).
+        Nothing is saved to users.json; the caller persists the tasks as part of its own write.
+        Return the number of history and comment entries removed.
+        """
+        policy = project.get("retention")
+        if not policy:
+            return 0
+        now = now or datetime.now()
+        cutoff = now - timedelta(days=policy["max_age_days"]) if policy.get("max_age_days") else None
+        removed = 0
+        archived = []
+        for task in project["tasks"] if tasks is None else tasks:
+            old_history, task['history'] = HistoryRetention.split(task['history'], policy.get("max_entries", 0), cutoff)
+            old_comments, task['comments'] = HistoryRetention.split(task['comments'], policy.get("max_entries", 0), cutoff)
+            if not old_history and not old_comments:
+                continue
+            summary = task.setdefault('history_summary', {"history": {}, "comments": {}, "until": None, "archived": 0})
+            for _, change in old_history:
+                kind = change.split(" to ")[0].split(" by ")[0]  # e.g. "Status changed", "Comment added"
+                summary["history"][kind] = summary["history"].get(kind, 0) + 1
+            for _, user, _ in old_comments:
+                summary["comments"][user] = summary["comments"].get(user, 0) + 1
+            newest = max(entry[0] if isinstance(entry[0], str) else entry[0].isoformat() for entry in old_history + old_comments)
+            summary["until"] = max(summary["until"] or "", newest)
+            if policy.get("mode") == "archive":
+                summary["archived"] += len(old_history) + len(old_comments)
+                archived.append((owner, project['id'], task['id'], old_history, old_comments))
+            removed += len(old_history) + len(old_comments)
+
+        if archived:
+            TaskArchive.archive_history(archived)
+        if removed:
+            logger.info(f"Retention policy removed {removed} history and comment entries from project {project['id']}")
+        return removed
 
 
 # Utility function to send verification email
@@ -160,6 +969,11 @@ def send_verification_email(email: str, otp: str) -> None:
     """
     Send a verification email with a one-time password (OTP) to the specified email address.
     """
+    # Imported here so that only registration pays for loading the mail and TLS modules
+    import smtplib
+    import ssl
+    from email.message import EmailMessage
+
     email_sender = 'trellomize@gmail.com'
     email_password = 'hxwr ctlg issq vbwl'  # CHANGE THIS LATER
     email_receiver = email
@@ -182,9 +996,13 @@ def send_verification_email(email: str, otp: str) -> None:
     em['Subject'] = subject
     em.set_content(body)
 
-    context = ssl.create_default_context()
+    if SMTP_USE_SSL:
+        context = ssl.create_default_context()
+        smtp = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=context)
+    else:
+        smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT)  # Plain connection, e.g. to a local test server
 
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465, context=context) as smtp:
+    with smtp:
         smtp.login(email_sender, email_password)
         smtp.sendmail(email_sender, email_receiver, em.as_string())
 
@@ -196,27 +1014,198 @@ def generate_otp() -> str:
     return str(random.randint(100000, 999999))
 
 # Inject custom CSS for a modern look
-st.markdown("""
-    <style>
-    body {
-        background-color: #F0F2F6;
-        color: #000000;
-        font-family: "sans-serif";
-    }
-    .stButton button {
-        background-color: #4CAF50;
-        color: white;
-        border: none;
-        border-radius: 5px;
-        padding: 10px 20px;
-    }
-    .stTextInput > div > div > input {
-        border: 2px solid #4CAF50;
-        border-radius: 5px;
-        padding: 10px;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+def inject_css() -> None:
+    """
+    Add the application's style sheet to the page.
+    """
+    st.markdown("""
+        <style>
+        body {
+            background-color: #F0F2F6;
+            color: #000000;
+            font-family: "sans-serif";
+        }
+        .stButton button {
+            background-color: #4CAF50;
+            color: white;
+            border: none;
+            border-radius: 5px;
+            padding: 10px 20px;
+        }
+        .stTextInput > div > div > input {
+            border: 2px solid #4CAF50;
+            border-radius: 5px;
+            padding: 10px;
+        }
+        .project-box {
+            border: 2px solid #4CAF50;
+            border-radius: 10px;
+            padding: 20px;
+            margin: 10px 0;
+            box-shadow: 0 4px 8px 0 rgba(0, 0, 0, 0.2);
+        }
+        .project-title {
+            font-size: 24px;
+            font-weight: bold;
+            color: #4CAF50;
+        }
+        .project-details {
+            margin: 10px 0;
+        }
+        .project-members {
+            margin-top: 10px;
+        }
+        </style>
+        """, unsafe_allow_html=True)
+
+
+# Class to keep rendered HTML fragments with least-recently-used eviction
+class FragmentCache:
+    def __init__(self, max_size: int = 1024) -> None:
+        """
+        Create an empty cache holding at most max_size fragments.
+        """
+        self.max_size = max_size
+        self.fragments: "OrderedDict[Tuple, str]" = OrderedDict()
+        self.lock = threading.Lock()  # Streamlit sessions share the cache across threads
+
+    def get_or_render(self, key: Tuple, render: Callable[[], str]) -> str:
+        """
+        Return the cached fragment for key, rendering and storing it on a miss.
+        """
+        with self.lock:
+            if key in self.fragments:
+                self.fragments.move_to_end(key)
+                return self.fragments[key]
+        fragment = render()
+        with self.lock:
+            self.fragments[key] = fragment
+            self.fragments.move_to_end(key)
+            while len(self.fragments) > self.max_size:
+                self.fragments.popitem(last=False)
+        return fragment
+
+
+@st.cache_resource
+def get_card_cache() -> FragmentCache:
+    """
+    Return the process-wide cache of project cards, which survives reruns.
+    """
+    return FragmentCache()
+
+
+def render_project_card(owner: str, project: Dict[str, Any]) -> str:
+    """
+    Return the HTML card of a project. User-supplied text is escaped, and the card is
+    only rendered again when the project's version changes.
+    """
+    def render() -> str:
+        return (
+            '<div class="project-box">'
+            f'<div class="project-title">{html.escape(project["title"])}</div>'
+            f'<div class="project-details"><strong>ID:</strong> {html.escape(project["id"])}</div>'
+            f'<div class="project-details"><strong>Description:</strong> {html.escape(project["description"])}</div>'
+            f'<div class="project-members"><strong>Members:</strong> {html.escape(", ".join(project["members"]))}</div>'
+            '</div>'
+        )
+
+    return get_card_cache().get_or_render((owner, project["id"], project.get("version", 0)), render)
+
+
+# Class to find the tasks assigned to each user across all projects
+class AssignmentIndex:
+    def __init__(self) -> None:
+        """
+        Create an empty index. For every project it keeps the version it was indexed at and
+        the project's task rows by assignee; every assignee has a version that changes
+        whenever one of their tasks may have changed.
+        """
+        self.projects: Dict[Tuple[str, str], Tuple[int, Dict[str, List[Dict[str, Any]]]]] = {}
+        self.versions: Dict[str, int] = {}
+        self.lock = threading.Lock()  # Streamlit sessions share the index across threads
+
+    def refresh(self, users: Dict[str, Dict]) -> None:
+        """
+        Re-index the projects whose version changed since the last refresh, and the ones that
+        were deleted, bumping the versions of the users assigned before or after the change.
+        """
+        with self.lock:
+            seen = set()
+            for owner, user in users.items():
+                for project in user.get('projects', {}).get('managed', []):
+                    key = (owner, project['id'])
+                    seen.add(key)
+                    cached = self.projects.get(key)
+                    if cached is not None and cached[0] == project.get('version', 0):
+                        continue
+                    rows: Dict[str, List[Dict[str, Any]]] = {}
+                    for task in project['tasks']:
+                        row = {
+                            "owner": owner,
+                            "project_id": project['id'],
+                            "project_title": project['title'],
+                            "id": task['id'],
+                            "title": task['title'],
+                            "status": task['status'].name if isinstance(task['status'], Status) else task['status'],
+                            "priority": task['priority'],
+                            "end_time": task['end_time'] if isinstance(task['end_time'], datetime) else datetime.fromisoformat(task['end_time']),
+                        }
+                        for assignee in task['assignees']:
+                            rows.setdefault(assignee, []).append(row)
+                    self.bump(set(rows) | set(cached[1] if cached else ()))
+                    self.projects[key] = (project.get('version', 0), rows)
+            for key in set(self.projects) - seen:
+                self.bump(set(self.projects.pop(key)[1]))
+
+    def bump(self, assignees: Set[str]) -> None:
+        """
+        Mark the assigned tasks of some users as changed. The caller holds the lock.
+        """
+        for assignee in assignees:
+            self.versions[assignee] = self.versions.get(assignee, 0) + 1
+
+    def version(self, username: str) -> int:
+        """
+        Return the current version of a user's assigned tasks.
+        """
+        with self.lock:
+            return self.versions.get(username, 0)
+
+    def tasks(self, username: str) -> List[Dict[str, Any]]:
+        """
+        Return the rows of all tasks assigned to a user, as of the last refresh.
+        """
+        with self.lock:
+            return [row for _, rows in self.projects.values() for row in rows.get(username, [])]
+
+    @staticmethod
+    def group(rows: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Group task rows by status, in workflow order, each group sorted by priority (most
+        urgent first) and then by end time.
+        """
+        priorities = {priority.name: priority.value for priority in Priority}
+        groups: Dict[str, List[Dict[str, Any]]] = {status.name: [] for status in Status}
+        for row in sorted(rows, key=lambda row: (priorities.get(row['priority'], len(priorities) + 1), row['end_time'])):
+            groups.setdefault(row['status'], []).append(row)
+        return {status: rows for status, rows in groups.items() if rows}
+
+
+@st.cache_resource
+def get_assignment_index() -> AssignmentIndex:
+    """
+    Return the process-wide index of assigned tasks, which survives reruns.
+    """
+    return AssignmentIndex()
+
+
+@st.cache_data(max_entries=1024)
+def my_work(username: str, version: int) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Return a user's assigned tasks grouped by status. The version is only part of the cache
+    key: a user's entry is recomputed after their assigned tasks change, and only then.
+    """
+    return AssignmentIndex.group(get_assignment_index().tasks(username))
 
 
 class UserActions:
@@ -257,6 +1246,7 @@ class UserActions:
             if st.sidebar.button("Verify and Register"):
                 if verification_code == st.session_state.otp:
                     # Hash the password and save the user
+                    import bcrypt  # Only loaded when a password is actually hashed or checked
                     hashed_password = bcrypt.hashpw(st.session_state.password.encode('utf-8'), bcrypt.gensalt())
                     users[st.session_state.username] = {
                         "email": st.session_state.email,
@@ -295,6 +1285,7 @@ class UserActions:
                 return
 
             # Verify the password
+            import bcrypt  # Only loaded when a password is actually hashed or checked
             if bcrypt.checkpw(password.encode('utf-8'), users[username]["password"].encode()):
                 st.session_state.logged_in = True
                 st.session_state.username = username
@@ -348,9 +1339,11 @@ class ProjectManagement:
                     "title": title,
                     "description": description,
                     "members": [],
-                    "tasks": tasks
+                    "tasks": tasks,
+                    "version": new_version()
                 })
                 UserDatabase.save_users(self.users)
+                ActivityLog.record(self.user['username'], project_id, self.user['username'], "Project created")
                 st.success("Project created successfully!")
                 logger.info(f"User {self.user['username']} created a new project with ID {project_id}")
             else:
@@ -369,10 +1362,14 @@ class ProjectManagement:
             # Check if the project ID exists
             if any(project["id"] == project_id for project in self.user["projects"]["managed"]):
                 project = next(project for project in self.user["projects"]["managed"] if project["id"] == project_id)
-                # Check if the username exists in the system
-                if username in self.users:
+                # Check that the user is not a member yet and exists in the system
+                if username in project["members"]:
+                    st.error("Error: User is already a member!")
+                elif username in self.users:
                     project["members"].append(username)
+                    touch_project(project)
                     UserDatabase.save_users(self.users)
+                    ActivityLog.record(self.user['username'], project_id, self.user['username'], f"Member {username} added")
                     st.success(f"User {username} added as a member.")
                     logger.info(f"User {username} added as a member to project {project_id}.")
                 else:
@@ -396,7 +1393,9 @@ class ProjectManagement:
                 # Check if the username is a member of the project
                 if username in project["members"]:
                     project["members"].remove(username)
+                    touch_project(project)
                     UserDatabase.save_users(self.users)
+                    ActivityLog.record(self.user['username'], project_id, self.user['username'], f"Member {username} removed")
                     st.success(f"User {username} removed from members.")
                     logger.info(f"User {username} removed from members in project {project_id}.")
                 else:
@@ -417,12 +1416,37 @@ class ProjectManagement:
                 if project["id"] == project_id:
                     self.user["projects"]["managed"].remove(project)
                     UserDatabase.save_users(self.users)
+                    ActivityLog.record(self.user['username'], project_id, self.user['username'], "Project deleted")
                     st.success("Project deleted successfully!")
                     logger.info(f"Project {project_id} deleted successfully!")
                     return
             st.error("Error: Project ID not found!")
 
 
+    def set_retention_policy(self) -> None:
+        """
+        Limit how much task history and how many comments a project keeps.
+        """
+        st.title("History Retention")
+
+        project_id = st.text_input("Enter project ID")
+        max_entries = st.number_input("Keep the last N history entries and comments per task (0 for no limit)", min_value=0, value=0)
+        max_age_days = st.number_input("Keep entries newer than this many days (0 for no limit)", min_value=0, value=0)
+        mode = st.selectbox("Older entries", RETENTION_MODES, format_func=lambda mode: "Summarize into counters" if mode == "summarize" else "Move to the archive")
+
+        if st.button("Save Policy"):
+            project = next((project for project in self.user["projects"]["managed"] if project["id"] == project_id), None)
+            if project is None:
+                st.error("Error: Project ID not found!")
+                return
+            project["retention"] = HistoryRetention.policy(int(max_entries), int(max_age_days), mode)
+            removed = HistoryRetention.enforce(self.user['username'], project)
+            touch_project(project)
+            UserDatabase.save_users(self.users)
+            ActivityLog.record(self.user['username'], project_id, self.user['username'], "History retention policy changed")
+            st.success(f"Retention policy saved, {removed} old entries compacted.")
+            logger.info(f"User {self.user['username']} set the retention policy of project {project_id} to {project['retention']}")
+
     def create_task(self) -> None:
         """
         Create a new task within a project.
@@ -445,7 +1469,9 @@ class ProjectManagement:
                 task = Task(title, description, assignees)
                 task.priority = priority_enum
                 project["tasks"].append(task.to_dict())
+                touch_project(project)
                 UserDatabase.save_users(self.users)
+                ActivityLog.record(self.user['username'], project_id, self.user['username'], f"Task '{title}' created", project["tasks"][-1])
                 st.success("Task created successfully!")
                 logger.info(f"Task '{title}' created successfully in project '{project_id}'!")
             else:
@@ -489,10 +1515,42 @@ class ProjectManagement:
             task['description'] = description
             task['priority'] = priority
             task['assignees'] = assignees
+            touch_project(project)
             UserDatabase.save_users(self.users)
+            ActivityLog.record(self.user['username'], project['id'], self.user['username'], f"Task '{title}' updated", task)
             st.success("Task updated successfully!")
             logger.info(f"Task '{title}' updated successfully!")
 
+    @staticmethod
+    def bulk_update_tasks(tasks: List[Dict[str, Any]], status: Optional[Status] = None, priority: Optional[Priority] = None,
+                          add_assignees: Optional[List[str]] = None, remove_assignees: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """
+        Apply the same status, priority and assignee changes to several tasks, recording a history
+        entry for every change. Nothing is saved; the caller persists the whole batch once.
+        Return the changes made, keyed by task ID, for the tasks that changed.
+        """
+        timestamp = datetime.now()
+        changed: Dict[str, List[str]] = {}
+        for task in tasks:
+            changes = []
+            if status is not None and task['status'] != status:
+                task['status'] = status
+                changes.append(f"Status changed to {status.name}")
+            if priority is not None and task['priority'] != priority.name:
+                task['priority'] = priority.name
+                changes.append(f"Priority changed to {priority.name}")
+            assignees = [assignee for assignee in task['assignees'] if assignee not in (remove_assignees or [])]
+            assignees += [assignee for assignee in (add_assignees or []) if assignee not in assignees]
+            if assignees != task['assignees']:
+                task['assignees'] = assignees
+                changes.append(f"Assignees changed to {', '.join(assignees)}")
+            for change in changes:
+                task['history'].append((timestamp, change))
+            if changes:
+                changed[task['id']] = changes
+                logger.info(f"Task {task['id']} bulk updated: {'; '.join(changes)}")
+        return changed
+
 class UserPage:
     def __init__(self, user: dict, users: dict) -> None:
         self.user = user
@@ -517,8 +1575,16 @@ class UserPage:
             self.view_member_projects()
         elif choice == "View Managed Projects":
             self.view_managed_projects()
+        elif choice == "My Work":
+            self.view_my_work()
+        elif choice == "Activity Feed":
+            self.view_activity_feed()
+        elif choice == "Archived Tasks":
+            self.view_archived_tasks()
         elif choice == "Create Task":
             project_management.create_task()
+        elif choice == "History Retention":
+            project_management.set_retention_policy()
         elif choice == "Logout":
             self.logout()
 
@@ -527,7 +1593,7 @@ class UserPage:
         Display the user page with options.
         """
         st.title("Welcome to your user page")
-        self.handle_choice(st.selectbox("Choose an option", ["Create Project", "View Managed Projects", "View Member Projects", "Create Task", "View Tasks", "Add Member", "Remove Member", "Delete Project", "Logout"]))
+        self.handle_choice(st.selectbox("Choose an option", ["Create Project", "View Managed Projects", "View Member Projects", "My Work", "Activity Feed", "Create Task", "View Tasks", "Archived Tasks", "History Retention", "Add Member", "Remove Member", "Delete Project", "Logout"]))
 
     def view_tasks(self) -> None:
         """
@@ -547,25 +1613,127 @@ class UserPage:
             for project in self.user["projects"]["managed"]:
                 if project["id"] == project_id:
                     st.write(f"Tasks for Project: {project['title']}")
-                    for task in project["tasks"]:
-                        st.write(f"Task ID: {task['id']}, Title: {task['title']}, Status: {task['status']}, Priority: {task['priority']}")
-                        if st.button(f"View Details", key=f"view_{task['id']}"):
-                            st.session_state.task_id = task['id']
-                            st.session_state.viewing_task = True
-                            st.session_state.editing_task = False
-                        if st.button(f"Edit Task", key=f"edit_{task['id']}"):
-                            st.session_state.task_id = task['id']
-                            st.session_state.editing_task = True
-                            st.session_state.viewing_task = False
+                    try:
+                        graph = get_task_graphs().get(self.user["username"], project)
+                    except ValueError as e:
+                        graph = None
+                        st.error(f"Error: {e}")
+                    if graph:
+                        titles = {task['id']: task['title'] for task in project["tasks"]}
+                        with get_task_graphs().lock:
+                            critical_path = graph.critical_path()
+                        if len(critical_path) > 1:
+                            st.write(f"Critical path: {' -> '.join(titles[task_id] for task_id in critical_path)}")
+                    self.select_tasks_by_filter(project)
+                    # Follow changes made by others from the point this run loaded the database
+                    st.session_state.change_subscription = ChangeSubscription([(self.user["username"], project_id)], st.session_state.get("loaded_change_id", 0))
+                    self.live_task_rows(project)
+                    self.apply_bulk_actions(project)
                     if st.session_state.get("viewing_task"):
                         self.view_task_details(project, st.session_state.task_id)
                     if st.session_state.get("editing_task"):
                         task = next((task for task in project["tasks"] if task["id"] == st.session_state.task_id), None)
-                        self.edit_task(project, task)
+                        if task:
+                            self.edit_task(project, task, graph)
+                        else:
+                            # The task was archived or removed since the form was opened
+                            st.session_state.editing_task = False
+                            st.error("Error: Task ID not found!")
                     break
             else:
                 st.error("Error: Project ID not found!")
 
+    @st.experimental_fragment(run_every=CHANGE_POLL_SECONDS)
+    def live_task_rows(self, project: dict) -> None:
+        """
+        Show the task rows of a project. Every few seconds only this part of the page reruns,
+        patching in the tasks that changed since the page was loaded.
+        """
+        events = st.session_state.change_subscription.poll()
+        if any(event["task_id"] is None for event in events):
+            st.experimental_rerun()  # Project-level change, e.g. members or archived tasks: reload the whole page
+        tasks = {task['id']: task for task in project["tasks"]}
+        for event in events:
+            # Only the last event of each task in a write carries its snapshot
+            if event["task"] is None or event["owner"] != self.user["username"]:
+                continue
+            if event["task_id"] in tasks:
+                tasks[event["task_id"]].update(event["task"])  # Keeps the loaded history and comments
+            else:
+                task = dict(event["task"], history=[], comments=[])
+                tasks[event["task_id"]] = task
+                project["tasks"].append(task)
+
+        for task in project["tasks"]:
+            st.checkbox("Select", key=f"select_{task['id']}")
+            st.write(f"Task ID: {task['id']}, Title: {task['title']}, Status: {task['status']}, Priority: {task['priority']}")
+            # Buttons inside the fragment only rerun the fragment, so rerun the page to open the task
+            if st.button(f"View Details", key=f"view_{task['id']}"):
+                st.session_state.task_id = task['id']
+                st.session_state.viewing_task = True
+                st.session_state.editing_task = False
+                st.experimental_rerun()
+            if st.button(f"Edit Task", key=f"edit_{task['id']}"):
+                st.session_state.task_id = task['id']
+                st.session_state.editing_task = True
+                st.session_state.viewing_task = False
+                st.experimental_rerun()
+
+    def select_tasks_by_filter(self, project: dict) -> None:
+        """
+        Tick the selection checkbox of every task matching a status, priority and assignee filter.
+        """
+        st.subheader("Select Tasks")
+        statuses = st.multiselect("Filter by status", [status.name for status in Status], key="bulk_filter_status")
+        priorities = st.multiselect("Filter by priority", [priority.name for priority in Priority], key="bulk_filter_priority")
+        assignee = st.selectbox("Filter by assignee", ["(any)"] + list(self.users.keys()), key="bulk_filter_assignee")
+
+        if st.button("Select Matching"):
+            for task in project["tasks"]:
+                st.session_state[f"select_{task['id']}"] = (
+                    (not statuses or task['status'].name in statuses)
+                    and (not priorities or task['priority'] in priorities)
+                    and (assignee == "(any)" or assignee in task['assignees'])
+                )
+        if st.button("Clear Selection"):
+            for task in project["tasks"]:
+                st.session_state[f"select_{task['id']}"] = False
+
+    def apply_bulk_actions(self, project: dict) -> None:
+        """
+        Change the status, priority or assignees of all selected tasks and save them in one write.
+        """
+        selected = [task for task in project["tasks"] if st.session_state.get(f"select_{task['id']}")]
+        st.subheader(f"Bulk Actions ({len(selected)} selected)")
+        status = st.selectbox("New status", ["(unchanged)"] + [status.name for status in Status], key="bulk_status")
+        priority = st.selectbox("New priority", ["(unchanged)"] + [priority.name for priority in Priority], key="bulk_priority")
+        add_assignees = st.multiselect("Add assignees", list(self.users.keys()), key="bulk_add_assignees")
+        remove_assignees = st.multiselect("Remove assignees", list(self.users.keys()), key="bulk_remove_assignees")
+
+        if st.button("Apply to Selected"):
+            if not selected:
+                st.error("Error: No tasks selected!")
+                return
+            changed = ProjectManagement.bulk_update_tasks(
+                selected,
+                status=None if status == "(unchanged)" else Status[status],
+                priority=None if priority == "(unchanged)" else Priority[priority],
+                add_assignees=add_assignees,
+                remove_assignees=remove_assignees,
+            )
+            if changed:
+                HistoryRetention.enforce(self.user['username'], project, [task for task in selected if task['id'] in changed])
+                # Tasks set to ARCHIVED leave the project right away instead of waiting for "Archive Now"
+                archived = TaskArchive.archive(self.user['username'], project, [task for task in selected if task['id'] in changed and task['status'] == Status.ARCHIVED])
+                touch_project(project)
+                UserDatabase.save_users(self.users)
+                ActivityLog.record_many([(self.user['username'], project['id'], self.user['username'], f"Task '{task['title']}': {change}", task) for task in selected for change in changed.get(task['id'], [])] + archived)
+                logger.info(f"User {self.user['username']} bulk updated {len(changed)} tasks in project {project['id']}")
+            st.session_state.bulk_message = f"{len(changed)} tasks updated successfully!"
+            st.experimental_rerun()
+        if st.session_state.get("bulk_message"):
+            st.success(st.session_state.pop("bulk_message"))
+
     def view_task_details(self, project: dict, task_id: str) -> None:
         """
         View details of a specific task.
@@ -573,6 +1741,16 @@ class UserPage:
         task = next((task for task in project["tasks"] if task["id"] == task_id), None)
         if task:
             st.write(f"Task Details:\nTitle: {task['title']}\nDescription: {task['description']}\nStatus: {task['status']}\nPriority: {task['priority']}\nAssignees: {', '.join(task['assignees'])}")
+            summary = task.get("history_summary")
+            if summary:
+                counts = ", ".join(f"{count} x {kind}" for kind, count in summary["history"].items())
+                st.write(f"Older history up to {summary['until'][:10]}: {counts or 'no changes'}; {sum(summary['comments'].values())} comments")
+                if summary["archived"] and st.button("Show Archived History"):
+                    history, comments = TaskArchive.archived_history(self.user["username"], task_id)
+                    for timestamp, change in history:
+                        st.write(f"{timestamp}: {change}")
+                    for timestamp, user, text in comments:
+                        st.write(f"{user} ({timestamp}): {text}")
             st.write("Comments:")
             for comment in task["comments"]:
                 st.write(f"{comment[1]} ({comment[0]}): {comment[2]}")
@@ -581,18 +1759,21 @@ class UserPage:
             comment = st.text_input("Enter your comment", key=comment_key)
             if st.button("Add Comment"):
                 user_name = self.user["username"]
-                timestamp = datetime.now().isoformat()
+                timestamp = datetime.now()  # Same types as Task.add_comment
                 task["comments"].append((timestamp, user_name, comment))
                 task["history"].append((timestamp, f"Comment added by {user_name}"))
+                HistoryRetention.enforce(self.user["username"], project, [task])
+                touch_project(project)
                 UserDatabase.save_users(self.users)
+                ActivityLog.record(user_name, project["id"], user_name, f"Comment added to '{task['title']}'", task)
                 st.success("Comment added successfully!")
                 st.experimental_rerun()
         else:
             st.error("Error: Task ID not found!")
 
-    def edit_task(self, project: dict, task: dict) -> None:
+    def edit_task(self, project: dict, task: dict, graph: Optional[TaskGraph] = None) -> None:
         """
-        Edit an existing task.
+        Edit an existing task, including its end date and the tasks it is blocked by.
         """
         st.write(f"Editing Task: {task['title']}")
 
@@ -603,13 +1784,37 @@ class UserPage:
         priority = st.selectbox("Task priority", priority_names, index=priority_index)
         available_users = list(self.users.keys())
         assignees = st.multiselect("Select assignees", available_users, default=task['assignees'])
+        end_date = st.date_input("Task end date", value=task['end_time'].date())
+        other_tasks = {other['id']: other['title'] for other in project["tasks"] if other['id'] != task['id']}
+        blocked_by = st.multiselect("Blocked by", list(other_tasks), default=[task_id for task_id in task['blocked_by'] if task_id in other_tasks], format_func=lambda task_id: other_tasks[task_id])
 
         if st.button("Update Task"):
+            end_time = datetime.combine(end_date, task['end_time'].time())
+            graphs = get_task_graphs()
+            if graph is None:
+                try:
+                    graph = graphs.get(self.user['username'], project)
+                except ValueError as e:
+                    st.error(f"Error: {e}")
+                    return
+            # Change the cached graph incrementally instead of rebuilding it
+            with graphs.lock:
+                try:
+                    graph.set_dependencies(task['id'], blocked_by)
+                except ValueError as e:
+                    st.error(f"Error: {e}")
+                    return
+                graph.set_duration(task['id'], max((end_time - task['start_time']).total_seconds(), 0.0))
+            task['end_time'] = end_time
+            task['blocked_by'] = blocked_by
             task['title'] = title
             task['description'] = description
             task['priority'] = priority
             task['assignees'] = assignees
+            touch_project(project)
+            graphs.put(self.user['username'], project, graph)  # The graph already reflects the new version
             UserDatabase.save_users(self.users)
+            ActivityLog.record(self.user['username'], project['id'], self.user['username'], f"Task '{title}' updated", task)
             st.success("Task updated successfully!")
             logger.info(f"Task '{title}' updated successfully!")
 
@@ -618,50 +1823,18 @@ class UserPage:
         View projects where the user is a member.
         """
         st.title("Member Projects")
-        member_projects = []
 
         # Check projects where the user is a member
-        for user_data in self.users.values():
-            for project in user_data["projects"]["managed"]:
-                if self.user["username"] in project["members"]:
-                    member_projects.append(project)
-
-        # CSS for the project boxes
-        st.markdown("""
-            <style>
-            .project-box {
-                border: 2px solid #4CAF50;
-                border-radius: 10px;
-                padding: 20px;
-                margin: 10px 0;
-                box-shadow: 0 4px 8px 0 rgba(0, 0, 0, 0.2);
-            }
-            .project-title {
-                font-size: 24px;
-                font-weight: bold;
-                color: #4CAF50;
-            }
-            .project-details {
-                margin: 10px 0;
-            }
-            .project-members {
-                margin-top: 10px;
-            }
-            </style>
-            """, unsafe_allow_html=True)
+        cards = [
+            render_project_card(owner, project)
+            for owner, user_data in self.users.items()
+            for project in user_data["projects"]["managed"]
+            if self.user["username"] in project["members"]
+        ]
 
         # Display projects in boxes
-        if member_projects:
-            for project in member_projects:
-                project_html = f"""
-                <div class="project-box">
-                    <div class="project-title">{project['title']}</div>
-                    <div class="project-details"><strong>ID:</strong> {project['id']}</div>
-                    <div class="project-details"><strong>Description:</strong> {project['description']}</div>
-                    <div class="project-members"><strong>Members:</strong> {', '.join(project['members'])}</div>
-                </div>
-                """
-                st.markdown(project_html, unsafe_allow_html=True)
+        if cards:
+            st.markdown("".join(cards), unsafe_allow_html=True)
         else:
             st.write("No member projects found.")
 
@@ -671,47 +1844,95 @@ class UserPage:
         """
         st.title("Managed Projects")
 
-        managed_projects = self.user["projects"]["managed"]
-
-        # CSS for the project boxes
-        st.markdown("""
-            <style>
-            .project-box {
-                border: 2px solid #4CAF50;
-                border-radius: 10px;
-                padding: 20px;
-                margin: 10px 0;
-                box-shadow: 0 4px 8px 0 rgba(0, 0, 0, 0.2);
-            }
-            .project-title {
-                font-size: 24px;
-                font-weight: bold;
-                color: #4CAF50;
-            }
-            .project-details {
-                margin: 10px 0;
-            }
-            .project-members {
-                margin-top: 10px;
-            }
-            </style>
-            """, unsafe_allow_html=True)
+        cards = [render_project_card(self.user["username"], project) for project in self.user["projects"]["managed"]]
 
         # Display projects in boxes
-        if managed_projects:
-            for project in managed_projects:
-                project_html = f"""
-                <div class="project-box">
-                    <div class="project-title">{project['title']}</div>
-                    <div class="project-details"><strong>ID:</strong> {project['id']}</div>
-                    <div class="project-details"><strong>Description:</strong> {project['description']}</div>
-                    <div class="project-members"><strong>Members:</strong> {', '.join(project['members'])}</div>
-                </div>
-                """
-                st.markdown(project_html, unsafe_allow_html=True)
+        if cards:
+            st.markdown("".join(cards), unsafe_allow_html=True)
         else:
             st.write("No managed projects found.")
 
+    def view_my_work(self) -> None:
+        """
+        List the tasks assigned to the current user across all projects, grouped by status.
+        """
+        st.title("My Work")
+        username = self.user["username"]
+        index = get_assignment_index()
+        index.refresh(self.users)
+        groups = my_work(username, index.version(username))
+        if not groups:
+            st.write("No tasks are assigned to you.")
+        for status, rows in groups.items():
+            st.subheader(f"{status} ({len(rows)})")
+            for row in rows:
+                st.write(f"Task ID: {row['id']}, Title: {row['title']}, Project: {row['project_title']} ({row['owner']}/{row['project_id']}), Priority: {row['priority']}, Due: {row['end_time']:%Y-%m-%d}")
+
+    def view_activity_feed(self) -> None:
+        """
+        View recent events in the user's managed and member projects, one page at a time.
+        """
+        st.title("Activity Feed")
+        username = self.user["username"]
+        projects = [(username, project["id"]) for project in self.user["projects"]["managed"]]
+        projects += [(owner, project["id"]) for owner, user_data in self.users.items() for project in user_data["projects"]["managed"] if username in project["members"]]
+
+        # Remember the previous visit once per session, then record this one
+        if "previous_visit" not in st.session_state:
+            st.session_state.previous_visit = ActivityLog.last_visit(username)
+            ActivityLog.mark_visit(username)
+
+        windows = {"Since last visit": st.session_state.previous_visit, "Last 24 hours": datetime.now() - timedelta(days=1), "Last 7 days": datetime.now() - timedelta(days=7), "All time": None}
+        window = st.selectbox("Show activity", list(windows), key="activity_window")
+        if st.session_state.get("activity_window_shown") != window:
+            st.session_state.activity_window_shown = window
+            st.session_state.activity_cursors = [None]
+
+        events, next_cursor = ActivityLog.query(projects, since=windows[window], cursor=st.session_state.activity_cursors[-1])
+        if events:
+            for event in events:
+                st.write(f"{event['timestamp']:%Y-%m-%d %H:%M} - {event['user']} in {event['owner']}/{event['project_id']}: {event['action']}")
+        else:
+            st.write("No activity found.")
+
+        if len(st.session_state.activity_cursors) > 1 and st.button("Newer"):
+            st.session_state.activity_cursors.pop()
+            st.experimental_rerun()
+        if next_cursor and st.button("Older"):
+            st.session_state.activity_cursors.append(next_cursor)
+            st.experimental_rerun()
+
+    def view_archived_tasks(self) -> None:
+        """
+        Archive finished tasks of the managed projects, and search or restore archived ones.
+        """
+        st.title("Archived Tasks")
+        username = self.user["username"]
+
+        done_after_days = st.number_input("Archive DONE tasks finished more than this many days ago", min_value=0, value=ARCHIVE_DONE_AFTER_DAYS)
+        if st.button("Archive Now"):
+            archived = TaskArchive.archive_tasks(self.users, int(done_after_days), owner=username)
+            st.success(f"{archived} tasks archived.")
+
+        project_id = st.text_input("Project ID (leave empty for all projects)", key="archive_project_id")
+        text = st.text_input("Search archived tasks", key="archive_search")
+        results = TaskArchive.search(username, project_id, text)
+        if not results:
+            st.write("No archived tasks found.")
+        for task in results:
+            st.write(f"Task ID: {task['task_id']}, Project: {task['project_id']}, Title: {task['title']}, Status: {task['status']}, Archived: {task['archived_at'][:10]}")
+            if st.button("Restore", key=f"restore_{task['task_id']}"):
+                try:
+                    restored = TaskArchive.restore(self.users, username, task['task_id'])
+                except ValueError as e:
+                    st.error(f"Error: {e}")
+                    continue
+                if restored:
+                    ActivityLog.record(username, task['project_id'], username, f"Task '{task['title']}' restored from archive", restored)
+                    st.experimental_rerun()
+                else:
+                    st.error("Error: Project ID not found!")
+
     def logout(self) -> None:
         """
         Logout the user.
@@ -726,6 +1947,8 @@ def main() -> None:
     """
     Main function to run the application.
     """
+    setup_logging()
+    inject_css()
     st.sidebar.title("Trellomize")
 
     # Check if user is logged in
@@ -735,12 +1958,13 @@ def main() -> None:
 
     # Handle logged in user actions
     if st.session_state.logged_in:
+        st.session_state.loaded_change_id = ActivityLog.latest_id()  # Changes up to here are in the loaded data
         users = UserDatabase.load_users()
         user = users[st.session_state.username]
         user["username"] = st.session_state.username  # Adding the username to user data
         user_page = UserPage(user, users)
 
-        options = ["Create Project", "View Member Projects", "View Managed Projects", "Create Task",  "View Tasks", "Add Member", "Remove Member", "Delete Project", "Logout"]
+        options = ["Create Project", "View Member Projects", "View Managed Projects", "My Work", "Activity Feed", "Create Task",  "View Tasks", "Archived Tasks", "History Retention", "Add Member", "Remove Member", "Delete Project", "Logout"]
         choice = st.sidebar.selectbox("User Actions", options)
         if choice:
             user_page.handle_choice(choice)
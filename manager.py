@@ -1,11 +1,25 @@
 import argparse
+import contextlib
+import csv
+import hashlib
+import io
 import json
 import os
-from typing import Optional
+import shutil
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
 
 # Define the file paths for user data
 ADMIN_FILE = 'admin.json'
 DATA_FILE = 'users.json'
+VERIFY_STATE_FILE = 'verify_state.json'
+ACTIVITY_FILE = 'activity.db'
+ARCHIVE_FILE = 'archive.db'
+SNAPSHOT_DIR = 'snapshots'
+SNAPSHOT_ATTEMPTS = 5  # Copies retried when the data file was saved while the databases were copied
 
 def create_admin(username: str, password: str) -> None:
     """
@@ -77,31 +91,617 @@ def deactivate_user(username: str) -> None:
     else:
         print(f"User '{username}' does not exist or is already deactivated.")
 
-# Set up argparse
-parser = argparse.ArgumentParser(description='System Admin Manager')
-subparsers = parser.add_subparsers(dest='command')
-
-# Subparser for creating admin
-create_admin_parser = subparsers.add_parser('create-admin')
-create_admin_parser.add_argument('--username', required=True, help='Username for the admin')
-create_admin_parser.add_argument('--password', required=True, help='Password for the admin')
-
-# Subparser for purging data
-purge_data_parser = subparsers.add_parser('purge-data')
-
-# Subparser for deactivating a user
-deactivate_user_parser = subparsers.add_parser('deactivate-user')
-deactivate_user_parser.add_argument('--username', required=True, help='Username to deactivate')
-
-# Parse the arguments
-args = parser.parse_args()
-
-# Execute commands based on arguments
-if args.command == 'create-admin':
-    create_admin(args.username, args.password)
-elif args.command == 'purge-data':
-    purge_data()
-elif args.command == 'deactivate-user':
-    deactivate_user(args.username)
-else:
-    parser.print_help()
+def archive_tasks(days: int) -> None:
+    """
+    Moves ARCHIVED tasks, and DONE tasks finished more than the given number of days ago, into the archive database.
+
+    Args:
+        days (int): Age in days after which DONE tasks are archived.
+
+    Returns:
+        None
+    """
+    if not os.path.exists(DATA_FILE):
+        print("No data file found to archive tasks from.")
+        return
+
+    from main import UserDatabase, TaskArchive
+
+    archived = TaskArchive.archive_tasks(UserDatabase.load_users(), days)
+    print(f"{archived} tasks archived.")
+
+def compact_history(project_id: Optional[str] = None) -> None:
+    """
+    Applies every project's history retention policy to all of its tasks and saves the data file once.
+    Policies are also enforced whenever a task changes; this catches up on tasks that have not changed since.
+
+    Args:
+        project_id (Optional[str]): Only compact this project.
+
+    Returns:
+        None
+    """
+    if not os.path.exists(DATA_FILE):
+        print("No data file found to compact.")
+        return
+
+    from main import UserDatabase, HistoryRetention, touch_project
+
+    users = UserDatabase.load_users()
+    removed = compacted = 0
+    for username, user in users.items():
+        for project in user['projects']['managed']:
+            if project_id is not None and project['id'] != project_id:
+                continue
+            count = HistoryRetention.enforce(username, project)
+            if count:
+                touch_project(project)
+                removed += count
+                compacted += 1
+    if removed:
+        UserDatabase.save_users(users)
+    print(f"{removed} history and comment entries compacted in {compacted} projects.")
+
+def iter_users(path: str, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, Dict[str, Any], str]]:
+    """
+    Streams the users out of the data file one at a time, so the whole file never has to be in memory.
+
+    Args:
+        path (str): The data file, a JSON object mapping usernames to users.
+        chunk_size (int): Number of characters to read at a time.
+
+    Returns:
+        Iterator[Tuple[str, Dict[str, Any], str]]: The username, the user and the user's raw JSON text.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as file:
+        buffer, position, eof = '', 0, False
+
+        def fill(size: int = chunk_size) -> bool:
+            # Drop what was consumed and read the next chunk; False once the file is exhausted
+            nonlocal buffer, position, eof
+            chunk = file.read(size)
+            buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+            return not eof
+
+        def next_token() -> str:
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position].isspace():
+                    position += 1
+                if position < len(buffer):
+                    return buffer[position]
+                if not fill():
+                    raise ValueError("Unexpected end of data file")
+
+        def next_value() -> Tuple[Any, str]:
+            nonlocal position
+            next_token()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                    if end < len(buffer) or eof:  # A number at the end of the buffer may continue in the next chunk
+                        raw, position = buffer[position:end], end
+                        return value, raw
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                # Every failed attempt re-parses the value from its start, so at least double what is
+                # buffered: the attempts then add up to a small multiple of the value's size
+                fill(max(chunk_size, len(buffer) - position))
+
+        if not fill() or next_token() != '{':
+            return
+        position += 1
+        while next_token() != '}':
+            if buffer[position] == ',':
+                position += 1
+                continue
+            username, _ = next_value()
+            if next_token() != ':':
+                raise ValueError(f"Expected ':' after '{username}' in data file")
+            position += 1
+            user, raw = next_value()
+            yield username, user, raw
+
+
+def normalize_timestamp(value: Any) -> Optional[str]:
+    """
+    Returns a timestamp as an ISO string, converting numeric epoch timestamps, or None if it is invalid.
+
+    Args:
+        value (Any): The stored timestamp.
+
+    Returns:
+        Optional[str]: The ISO timestamp, or None.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value).isoformat()
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).isoformat()
+        except ValueError:
+            return None
+    return None
+
+
+def check_user(username: str, user: Dict[str, Any], usernames: Set[str], repair: bool) -> List[Tuple[str, bool]]:
+    """
+    Checks a user's record and managed projects against the data model, repairing what can be repaired.
+
+    Args:
+        username (str): The username.
+        user (Dict[str, Any]): The user's record, modified in place when repairing.
+        usernames (Set[str]): All usernames in the data file.
+        repair (bool): Whether to fix issues that have an unambiguous repair.
+
+    Returns:
+        List[Tuple[str, bool]]: Every issue found and whether it was repaired.
+    """
+    from main import Priority, Status, new_version, touch_project
+
+    issues: List[Tuple[str, bool]] = []
+
+    def issue(message: str, repairable: bool = False) -> bool:
+        issues.append((message, repair and repairable))
+        return repair and repairable
+
+    if not isinstance(user, dict):
+        issue(f"{username}: record is not an object")
+        return issues
+    for key in ('email', 'password', 'active', 'projects'):
+        if key not in user:
+            issue(f"{username}: missing '{key}'")
+    projects = user.get('projects', {})
+    if not isinstance(projects, dict):
+        issue(f"{username}: 'projects' is not an object")
+        return issues
+    managed = projects.get('managed', [])
+    if not isinstance(managed, list):
+        issue(f"{username}: managed projects are not a list")
+        return issues
+
+    def is_list(value: Any, where: str, field: str) -> bool:
+        # Values of the wrong type are reported, never replaced: a repair would throw the data away
+        if isinstance(value, list):
+            return True
+        issue(f"{where}: {field} {value!r} is not a list")
+        return False
+
+    def check_usernames(names: List[Any], where: str, kind: str) -> List[Any]:
+        checked: List[Any] = []
+        for name in names:
+            if not isinstance(name, str):
+                issue(f"{where}: {kind} {name!r} is not a username")
+            elif name in checked:
+                if issue(f"{where}: duplicate {kind} '{name}'", True):
+                    continue
+            elif name not in usernames:
+                if issue(f"{where}: {kind} '{name}' does not exist", True):
+                    continue
+            checked.append(name)
+        return checked
+
+    project_ids: Set[str] = set()
+    for project_index, project in enumerate(managed):
+        if not isinstance(project, dict):
+            issue(f"{username}: managed project {project_index} is not an object")
+            continue
+        where = f"{username}/{project.get('id')}"
+        repaired_before = sum(fixed for _, fixed in issues)
+        if not isinstance(project.get('id'), str):
+            issue(f"{where}: project ID {project.get('id')!r} is not a string")
+        elif project['id'] in project_ids:
+            issue(f"{where}: duplicate project ID")
+        else:
+            project_ids.add(project['id'])
+        version = project.get('version', 0)
+        if not isinstance(version, int) or isinstance(version, bool):
+            if issue(f"{where}: version is not an integer", True):
+                project['version'] = new_version()
+
+        if is_list(project.get('members', []), where, 'members'):
+            project['members'] = check_usernames(project.get('members', []), where, 'member')
+
+        tasks = project.get('tasks', [])
+        if not is_list(tasks, where, 'tasks'):
+            tasks = []
+        task_ids: Set[str] = set()
+        for task_index, task in enumerate(tasks):
+            if not isinstance(task, dict):
+                issue(f"{where}: task {task_index} is not an object")
+                continue
+            task_where = f"{where}/{task.get('id')}"
+            if not isinstance(task.get('id'), str):
+                issue(f"{task_where}: task ID {task.get('id')!r} is not a string")
+            elif task['id'] in task_ids:
+                issue(f"{task_where}: duplicate task ID")
+            else:
+                task_ids.add(task['id'])
+
+            status = task.get('status')
+            if not (isinstance(status, str) and status in Status.__members__):
+                if isinstance(status, int) and not isinstance(status, bool) and status in {member.value for member in Status}:
+                    if issue(f"{task_where}: status {status!r} is not a name", True):
+                        task['status'] = Status(status).name
+                else:
+                    issue(f"{task_where}: invalid status {status!r}")
+
+            priority = task.get('priority')
+            if not (isinstance(priority, str) and priority in Priority.__members__):
+                if isinstance(priority, int) and not isinstance(priority, bool) and priority in {member.value for member in Priority}:
+                    fixed = Priority(priority).name
+                elif isinstance(priority, str) and priority.upper() in Priority.__members__:
+                    fixed = priority.upper()
+                else:
+                    fixed = None
+                if issue(f"{task_where}: invalid priority {priority!r}", fixed is not None) and fixed:
+                    task['priority'] = fixed
+
+            for field in ('title', 'description'):
+                if not isinstance(task.get(field, ''), str):
+                    issue(f"{task_where}: {field} {task[field]!r} is not a string")
+
+            for field in ('start_time', 'end_time'):
+                fixed = normalize_timestamp(task.get(field))
+                if fixed is None:
+                    issue(f"{task_where}: invalid {field} {task.get(field)!r}")
+                elif fixed != task[field]:
+                    if issue(f"{task_where}: {field} {task[field]!r} is not an ISO timestamp", True):
+                        task[field] = fixed
+
+            for field, size in (('history', 2), ('comments', 3)):
+                entries = task.get(field, [])
+                if not is_list(entries, task_where, field):
+                    continue
+                for index, entry in enumerate(entries):
+                    if not isinstance(entry, list) or len(entry) != size:
+                        issue(f"{task_where}: malformed {field} entry {index}")
+                        continue
+                    fixed = normalize_timestamp(entry[0])
+                    if fixed is None:
+                        issue(f"{task_where}: invalid timestamp in {field} entry {index}")
+                    elif fixed != entry[0]:
+                        if issue(f"{task_where}: {field} entry {index} has a non-ISO timestamp", True):
+                            entry[0] = fixed
+
+            if is_list(task.get('assignees', []), task_where, 'assignees'):
+                task['assignees'] = check_usernames(task.get('assignees', []), task_where, 'assignee')
+
+        if sum(fixed for _, fixed in issues) > repaired_before:
+            touch_project(project)  # Caches keyed by the project version must not keep serving the old data
+    return issues
+
+
+def verify_data(repair: bool = False, incremental: bool = False, data_file: Optional[str] = None, state_file: Optional[str] = VERIFY_STATE_FILE) -> None:
+    """
+    Streams through the data file and checks referential and type invariants, optionally repairing them.
+    In incremental mode users whose records are unchanged since the last clean check are skipped.
+
+    Args:
+        repair (bool): Whether to fix issues that have an unambiguous repair and rewrite the data file.
+        incremental (bool): Whether to only check users changed since the last run.
+        data_file (Optional[str]): The data file to check, DATA_FILE by default.
+        state_file (Optional[str]): Where the incremental state is kept, or None to keep no state.
+
+    Returns:
+        None
+    """
+    data_file = data_file or DATA_FILE
+    if not os.path.exists(data_file):
+        print("No data file found to verify.")
+        return
+
+    state: Dict[str, Any] = {'users': {}, 'usernames': []}
+    if incremental and state_file and os.path.exists(state_file):
+        with open(state_file, 'r') as f:
+            state = json.load(f)
+
+    # First pass: the set of usernames that references are checked against
+    usernames = {username for username, _, _ in iter_users(data_file)}
+    if set(state['usernames']) - usernames:
+        state['users'] = {}  # Users were removed, so unchanged records may now hold dangling references
+
+    checked = found = repaired = 0
+    repaired_projects: List[Tuple[str, str]] = []
+    new_state: Dict[str, Any] = {'users': {}, 'usernames': sorted(usernames)}
+    output = None
+    if repair:
+        file_descriptor, temp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(data_file)), suffix='.tmp')
+        output = os.fdopen(file_descriptor, 'w')
+        output.write('{')
+
+    # Second pass: check (and rewrite) one user at a time
+    for index, (username, user, raw) in enumerate(iter_users(data_file)):
+        digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        issues: List[Tuple[str, bool]] = []
+        if state['users'].get(username) != digest:
+            checked += 1
+            managed = user.get('projects', {}).get('managed', []) if isinstance(user, dict) and isinstance(user.get('projects'), dict) else []
+            projects = [project for project in managed if isinstance(project, dict)] if isinstance(managed, list) else []
+            versions = [project.get('version') for project in projects]
+            issues = check_user(username, user, usernames, repair)
+            repaired_projects += [(username, project.get('id')) for project, version in zip(projects, versions)
+                                  if project.get('version') != version and isinstance(project.get('id'), str)]
+            for message, fixed in issues:
+                print(f"{message}{' (repaired)' if fixed else ''}")
+            found += len(issues)
+            repaired += sum(fixed for _, fixed in issues)
+        if output:
+            raw = json.dumps(user, indent=4).replace('\n', '\n    ')
+            digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+            output.write(f"{',' if index else ''}\n    {json.dumps(username)}: {raw}")
+        if all(fixed for _, fixed in issues):
+            new_state['users'][username] = digest  # Users with open issues are checked again next time
+
+    if output:
+        output.write('\n}')
+        output.close()
+        from main import replace_file
+
+        replace_file(temp_file, data_file)
+    if repaired_projects:
+        from main import ActivityLog
+
+        # Open task lists reload on project-level events, so they drop the repaired data too
+        ActivityLog.record_many([(owner, project_id, 'admin', "Data repaired by verify", None) for owner, project_id in repaired_projects])
+    if state_file:
+        with open(state_file, 'w') as f:
+            json.dump(new_state, f)
+    print(f"Checked {checked} of {len(usernames)} users: {found} issues found, {repaired} repaired.")
+
+def take_snapshot(directory: Optional[str] = None) -> str:
+    """
+    Takes a copy of the data file and the activity and archive databases without blocking the app.
+
+    Each file is consistent on its own: the data file is only ever replaced as a whole, so the file
+    that is open when the copy starts is a complete version, and the databases are copied with the
+    SQLite backup API. Across files, the app writes the archive before saving tasks out of the data
+    file, and saves tasks back into the data file before deleting them from the archive. So if the
+    data file is not replaced while the databases are copied, every task is in the snapshot's data
+    file or archive (at worst in both); the copy is retried when a save happens in between. The
+    activity log is written just after each save and may miss the events of the latest saves.
+
+    Args:
+        directory (Optional[str]): Where to create the snapshot, a new folder in SNAPSHOT_DIR by default.
+
+    Returns:
+        str: The snapshot folder.
+    """
+    directory = directory or os.path.join(SNAPSHOT_DIR, datetime.now().strftime('%Y%m%d-%H%M%S-%f'))
+    os.makedirs(directory)
+    consistent = False
+    for _ in range(SNAPSHOT_ATTEMPTS):
+        source = open(DATA_FILE, 'rb') if os.path.exists(DATA_FILE) else None
+        try:
+            if source:
+                with open(os.path.join(directory, 'users.json'), 'wb') as target:
+                    shutil.copyfileobj(source, target)
+            for database, name in ((ACTIVITY_FILE, 'activity.db'), (ARCHIVE_FILE, 'archive.db')):
+                if os.path.exists(database):
+                    with contextlib.closing(sqlite3.connect(database)) as connection, contextlib.closing(sqlite3.connect(os.path.join(directory, name))) as target:
+                        connection.backup(target)
+            # Saves replace the data file, so a save since it was opened shows up as a different file.
+            # The copied file is still open here, so its inode cannot have been reused.
+            try:
+                current = os.stat(DATA_FILE)
+            except FileNotFoundError:
+                current = None
+            opened = os.fstat(source.fileno()) if source else None
+            consistent = (current is None and opened is None) or (
+                current is not None and opened is not None and (current.st_ino, current.st_mtime_ns) == (opened.st_ino, opened.st_mtime_ns))
+        finally:
+            if source:
+                source.close()
+        if consistent:
+            break
+    if not consistent:
+        print(f"Warning: the data file kept changing during {SNAPSHOT_ATTEMPTS} attempts; the snapshot is only consistent per file.")
+    with open(os.path.join(directory, 'snapshot.json'), 'w') as f:
+        json.dump({'taken_at': datetime.now().isoformat(), 'consistent': consistent}, f)
+    return directory
+
+def report_job(snapshot: str) -> str:
+    """
+    Summarizes the users, projects and tasks of a snapshot.
+
+    Args:
+        snapshot (str): The snapshot folder.
+
+    Returns:
+        str: The report.
+    """
+    now = datetime.now().isoformat()
+    users = active = projects = tasks = overdue = 0
+    statuses: Dict[str, int] = {}
+    data_file = os.path.join(snapshot, 'users.json')
+    for _, user, _ in iter_users(data_file) if os.path.exists(data_file) else ():
+        users += 1
+        active += bool(user.get('active'))
+        for project in user.get('projects', {}).get('managed', []):
+            projects += 1
+            for task in project.get('tasks', []):
+                tasks += 1
+                statuses[task.get('status')] = statuses.get(task.get('status'), 0) + 1
+                overdue += task.get('status') not in ('DONE', 'ARCHIVED') and str(task.get('end_time')) < now
+
+    lines = [f"Users: {users} ({active} active)", f"Projects: {projects}", f"Tasks: {tasks} ({overdue} overdue)"]
+    lines += [f"  {status}: {count}" for status, count in sorted(statuses.items(), key=lambda item: str(item[0]))]
+    for name, label, sql in (('archive.db', "Archived tasks", "SELECT COUNT(*) FROM archived_tasks"), ('activity.db', "Activity events", "SELECT COUNT(*) FROM events")):
+        if os.path.exists(os.path.join(snapshot, name)):
+            with contextlib.closing(sqlite3.connect(os.path.join(snapshot, name))) as connection:
+                try:
+                    lines.append(f"{label}: {connection.execute(sql).fetchone()[0]}")
+                except sqlite3.OperationalError:
+                    lines.append(f"{label}: 0")
+    return "\n".join(lines)
+
+def export_job(snapshot: str, output: str) -> str:
+    """
+    Exports every task of a snapshot to a CSV file.
+
+    Args:
+        snapshot (str): The snapshot folder.
+        output (str): The CSV file to write.
+
+    Returns:
+        str: A summary of the export.
+    """
+    count = 0
+    data_file = os.path.join(snapshot, 'users.json')
+    with open(output, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['owner', 'project_id', 'task_id', 'title', 'status', 'priority', 'assignees', 'start_time', 'end_time'])
+        for username, user, _ in iter_users(data_file) if os.path.exists(data_file) else ():
+            for project in user.get('projects', {}).get('managed', []):
+                for task in project.get('tasks', []):
+                    writer.writerow([username, project.get('id'), task.get('id'), task.get('title'), task.get('status'), task.get('priority'),
+                                     ';'.join(task.get('assignees', [])), task.get('start_time'), task.get('end_time')])
+                    count += 1
+    return f"Exported {count} tasks to {output}."
+
+def verify_job(snapshot: str) -> str:
+    """
+    Checks the data file of a snapshot without repairing it or touching the incremental state.
+
+    Args:
+        snapshot (str): The snapshot folder.
+
+    Returns:
+        str: The issues found.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        verify_data(data_file=os.path.join(snapshot, 'users.json'), state_file=None)
+    return output.getvalue().rstrip()
+
+def run_snapshot_jobs(snapshot: str, jobs: List[Tuple[str, Callable[..., str], Tuple]]) -> None:
+    """
+    Runs jobs against a snapshot in a separate pool of processes, one process per job, and prints their results.
+
+    Args:
+        snapshot (str): The snapshot folder.
+        jobs (List[Tuple[str, Callable[..., str], Tuple]]): The name, function and extra arguments of every job.
+
+    Returns:
+        None
+    """
+    with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = [(name, pool.submit(job, snapshot, *args)) for name, job, args in jobs]
+        for name, future in futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                result = f"Error: {e}"
+            print(f"== {name} ==\n{result}")
+
+def snapshot(source: Optional[str], report: bool, export: Optional[str], verify: bool) -> None:
+    """
+    Takes a snapshot (or reuses an existing one) and runs the requested reports, exports and checks against it.
+
+    Args:
+        source (Optional[str]): An existing snapshot folder to use instead of taking a new snapshot.
+        report (bool): Whether to print a summary report.
+        export (Optional[str]): A CSV file to export all tasks to.
+        verify (bool): Whether to check the data file for problems.
+
+    Returns:
+        None
+    """
+    if source is None:
+        source = take_snapshot()
+        print(f"Snapshot taken in {source}")
+    elif not os.path.isdir(source):
+        print(f"Snapshot '{source}' not found.")
+        return
+
+    jobs: List[Tuple[str, Callable[..., str], Tuple]] = []
+    if report:
+        jobs.append(("Report", report_job, ()))
+    if export:
+        jobs.append(("Export", export_job, (export,)))
+    if verify:
+        jobs.append(("Verify", verify_job, ()))
+    if jobs:
+        run_snapshot_jobs(source, jobs)
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Builds the command line parser for the admin commands.
+
+    Args:
+        None
+
+    Returns:
+        argparse.ArgumentParser: The parser with one subparser per command.
+    """
+    parser = argparse.ArgumentParser(description='System Admin Manager')
+    subparsers = parser.add_subparsers(dest='command')
+
+    # Subparser for creating admin
+    create_admin_parser = subparsers.add_parser('create-admin')
+    create_admin_parser.add_argument('--username', required=True, help='Username for the admin')
+    create_admin_parser.add_argument('--password', required=True, help='Password for the admin')
+
+    # Subparser for purging data
+    subparsers.add_parser('purge-data')
+
+    # Subparser for deactivating a user
+    deactivate_user_parser = subparsers.add_parser('deactivate-user')
+    deactivate_user_parser.add_argument('--username', required=True, help='Username to deactivate')
+
+    # Subparser for archiving finished tasks
+    archive_tasks_parser = subparsers.add_parser('archive-tasks')
+    archive_tasks_parser.add_argument('--days', type=int, default=30, help='Archive DONE tasks finished more than this many days ago')
+
+    # Subparser for compacting task history
+    compact_history_parser = subparsers.add_parser('compact-history')
+    compact_history_parser.add_argument('--project', help='Only compact this project ID')
+
+    # Subparser for verifying (and repairing) the data file
+    verify_parser = subparsers.add_parser('verify')
+    verify_parser.add_argument('--repair', action='store_true', help='Fix issues that have an unambiguous repair')
+    verify_parser.add_argument('--incremental', action='store_true', help='Only check users changed since the last run')
+
+    # Subparser for snapshots and the reports, exports and checks run against them
+    snapshot_parser = subparsers.add_parser('snapshot')
+    snapshot_parser.add_argument('--from', dest='source', help='Use this existing snapshot folder instead of taking a new one')
+    snapshot_parser.add_argument('--report', action='store_true', help='Print a summary report')
+    snapshot_parser.add_argument('--export', metavar='CSV', help='Export all tasks to this CSV file')
+    snapshot_parser.add_argument('--verify', action='store_true', help='Check the data for problems')
+
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Parses the command line and runs the requested admin command.
+
+    Args:
+        argv (Optional[List[str]]): Arguments to parse, defaults to sys.argv.
+
+    Returns:
+        None
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # Execute commands based on arguments
+    if args.command == 'create-admin':
+        create_admin(args.username, args.password)
+    elif args.command == 'purge-data':
+        purge_data()
+    elif args.command == 'deactivate-user':
+        deactivate_user(args.username)
+    elif args.command == 'archive-tasks':
+        archive_tasks(args.days)
+    elif args.command == 'compact-history':
+        compact_history(args.project)
+    elif args.command == 'verify':
+        verify_data(args.repair, args.incremental)
+    elif args.command == 'snapshot':
+        snapshot(args.source, args.report, args.export, args.verify)
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
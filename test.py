@@ -1,10 +1,18 @@
 import unittest
 from unittest.mock import patch, mock_open, MagicMock
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import os
+import tempfile
 import bcrypt
-from mmw import Task, Priority, Status, UserDatabase, UserActions, generate_otp
+import io
+import contextlib
+import manager
+import shutil
+import api
+import tornado.testing
+import base64
+from mmw import Task, TaskGraph, TaskGraphCache, Priority, Status, UserDatabase, UserActions, ProjectManagement, ActivityLog, ChangeSubscription, TaskArchive, HistoryRetention, FragmentCache, AssignmentIndex, render_project_card, touch_project, new_version, generate_otp
 
 class TestTask(unittest.TestCase):
 
@@ -40,6 +48,61 @@ class TestTask(unittest.TestCase):
         self.assertEqual(task_dict["status"], "BACKLOG")
 
 
+class TestTaskGraph(unittest.TestCase):
+
+    def setUp(self):
+        start = datetime(2024, 1, 1)
+        self.tasks = [
+            {"id": task_id, "start_time": start, "end_time": start.replace(day=1 + days), "blocked_by": []}
+            for task_id, days in (("a", 1), ("b", 2), ("c", 3), ("d", 1))
+        ]
+        self.graph = TaskGraph.from_tasks(self.tasks)
+
+    def test_topological_order(self):
+        self.graph.add_dependency("a", "d")
+        self.graph.add_dependency("b", "a")
+        order = self.graph.topological_order()
+        self.assertLess(order.index("d"), order.index("a"))
+        self.assertLess(order.index("a"), order.index("b"))
+
+    def test_cycle_rejected(self):
+        self.graph.add_dependency("b", "a")
+        self.graph.add_dependency("c", "b")
+        with self.assertRaises(ValueError):
+            self.graph.add_dependency("a", "c")
+        self.assertNotIn("c", self.graph.blockers["a"])
+
+    def test_set_dependencies_rolls_back_on_cycle(self):
+        self.graph.add_dependency("b", "a")
+        with self.assertRaises(ValueError):
+            self.graph.set_dependencies("a", ["d", "b"])
+        self.assertEqual(self.graph.blockers["a"], set())
+
+    def test_critical_path(self):
+        self.graph.add_dependency("b", "a")
+        self.graph.add_dependency("d", "b")
+        self.assertEqual(self.graph.critical_path(), ["a", "b", "d"])
+        self.graph.set_duration("c", 10 * 86400)
+        self.assertEqual(self.graph.critical_path(), ["c"])
+
+    def test_graph_cache(self):
+        cache = TaskGraphCache()
+        project = {"id": "p1", "tasks": self.tasks, "version": 1}
+        graph = cache.get("owner", project)
+        self.assertIs(cache.get("owner", project), graph)
+
+        # An incrementally changed graph is stored under the project's new version
+        graph.set_dependencies("b", ["a"])
+        project["version"] = 2
+        cache.put("owner", project, graph)
+        self.assertIs(cache.get("owner", project), graph)
+
+        # A session holding older data gets its own graph without replacing the newer one
+        stale = cache.get("owner", dict(project, version=1))
+        self.assertIsNot(stale, graph)
+        self.assertIs(cache.get("owner", project), graph)
+
+
 class TestUserDatabase(unittest.TestCase):
 
     @patch("builtins.open", new_callable=mock_open, read_data='{}')
@@ -52,11 +115,499 @@ class TestUserDatabase(unittest.TestCase):
         users = UserDatabase.load_users()
         self.assertIn("user1", users)
 
-    @patch("builtins.open", new_callable=mock_open)
-    def test_save_users(self, mock_file):
+    def test_save_users(self):
         users = {"user1": {"email": "test@test.com", "projects": {"managed": []}}}
-        UserDatabase.save_users(users)
-        mock_file().write.assert_called_once_with(json.dumps(users, indent=4, default=UserDatabase.serialize))
+        with tempfile.TemporaryDirectory() as directory, patch("mmw.DATABASE_FILE", os.path.join(directory, "users.json")) as path:
+            UserDatabase.save_users(users)
+            with open(path) as file:
+                self.assertEqual(file.read(), json.dumps(users, indent=4, default=UserDatabase.serialize))
+            self.assertEqual(os.listdir(directory), ["users.json"])
+
+    def test_save_users_keeps_file_mode(self):
+        with tempfile.TemporaryDirectory() as directory, patch("mmw.DATABASE_FILE", os.path.join(directory, "users.json")) as path:
+            umask = os.umask(0o027)
+            try:
+                UserDatabase.save_users({})
+            finally:
+                os.umask(umask)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+            self.assertEqual(os.listdir(directory), ["users.json"])
+            os.chmod(path, 0o604)
+            UserDatabase.save_users({"user1": {}})
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o604)
+
+
+class TestBulkUpdate(unittest.TestCase):
+
+    def setUp(self):
+        self.tasks = []
+        for assignees in (["user1"], ["user1", "user2"]):
+            task = Task("Test Task", "This is a test task", assignees).to_dict()
+            task["status"] = Status[task["status"]]
+            task["history"] = []
+            self.tasks.append(task)
+
+    def test_bulk_update_records_history(self):
+        changed = ProjectManagement.bulk_update_tasks(self.tasks, status=Status.DONE, priority=Priority.HIGH, add_assignees=["user3"], remove_assignees=["user1"])
+        self.assertEqual(len(changed), 2)
+        for task in self.tasks:
+            self.assertEqual(task["status"], Status.DONE)
+            self.assertEqual(task["priority"], "HIGH")
+            self.assertNotIn("user1", task["assignees"])
+            self.assertIn("user3", task["assignees"])
+            self.assertEqual(len(task["history"]), 3)
+
+    def test_bulk_update_skips_unchanged(self):
+        changed = ProjectManagement.bulk_update_tasks(self.tasks, add_assignees=["user2"])
+        self.assertEqual(list(changed), [self.tasks[0]["id"]])
+        self.assertEqual(self.tasks[1]["history"], [])
+
+
+class TestActivityLog(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        patcher = patch("mmw.ACTIVITY_DATABASE_FILE", os.path.join(self.directory.name, "activity.db"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+        for day in range(1, 6):
+            ActivityLog.record("user1", "p1", "user1", f"Event {day}", timestamp=datetime(2024, 1, day))
+        ActivityLog.record("user2", "p2", "user2", "Other project", timestamp=datetime(2024, 1, 3))
+        ActivityLog.record("user2", "p1", "user2", "Same ID, other owner", timestamp=datetime(2024, 1, 3))
+
+    def test_query_window(self):
+        events, cursor = ActivityLog.query([("user1", "p1")], since=datetime(2024, 1, 2), until=datetime(2024, 1, 4))
+        self.assertEqual([event["action"] for event in events], ["Event 3", "Event 2"])
+        self.assertIsNone(cursor)
+
+    def test_projects_are_keyed_by_owner(self):
+        events, _ = ActivityLog.query([("user2", "p1")])
+        self.assertEqual([event["action"] for event in events], ["Same ID, other owner"])
+
+    def test_query_by_user(self):
+        events, _ = ActivityLog.query(user="user2")
+        self.assertEqual([event["project_id"] for event in events], ["p1", "p2"])
+
+    def test_cursor_pagination(self):
+        first, cursor = ActivityLog.query([("user1", "p1"), ("user2", "p2")], limit=4)
+        second, last_cursor = ActivityLog.query([("user1", "p1"), ("user2", "p2")], cursor=cursor, limit=4)
+        self.assertEqual(len(first), 4)
+        self.assertEqual(len(second), 2)
+        self.assertIsNone(last_cursor)
+        self.assertEqual(second[-1]["action"], "Event 1")
+
+    def test_change_subscription(self):
+        subscription = ChangeSubscription([("user1", "p1")], ActivityLog.latest_id())
+        self.assertEqual(subscription.poll(), [])
+        task = Task("Test Task", "This is a test task", ["user1"]).to_dict()
+        ActivityLog.record("user2", "p2", "user2", "Task created", task)
+        ActivityLog.record("user1", "p1", "user1", "Task created", task)
+        ActivityLog.record("user2", "p1", "user2", "Same ID, other owner", task)
+        events = subscription.poll()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["task"]["status"], Status.BACKLOG)
+        self.assertNotIn("history", events[0]["task"])
+        self.assertEqual(subscription.poll(), [])
+
+    def test_one_snapshot_per_task(self):
+        subscription = ChangeSubscription([("user1", "p1")], ActivityLog.latest_id())
+        tasks = [Task(f"Task {index}", "This is a test task", ["user1"]).to_dict() for index in range(2)]
+        ActivityLog.record_many([("user1", "p1", "user1", change, task) for task in tasks for change in ("Status changed", "Priority changed")])
+        events = subscription.poll()
+        self.assertEqual([event["task"] is not None for event in events], [False, True, False, True])
+        self.assertEqual([event["task"]["title"] for event in events if event["task"]], ["Task 0", "Task 1"])
+
+    def test_visits(self):
+        self.assertIsNone(ActivityLog.last_visit("user1"))
+        ActivityLog.mark_visit("user1", datetime(2024, 2, 1))
+        self.assertEqual(ActivityLog.last_visit("user1"), datetime(2024, 2, 1))
+
+
+class TestTaskArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        for name, file_name in (("mmw.ARCHIVE_DATABASE_FILE", "archive.db"), ("mmw.ACTIVITY_DATABASE_FILE", "activity.db"), ("mmw.DATABASE_FILE", "users.json")):
+            patcher = patch(name, os.path.join(self.directory.name, file_name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+        self.tasks = []
+        for title, status, age in (("Old", Status.DONE, 40), ("Recent", Status.DONE, 1), ("Archived", Status.ARCHIVED, 0), ("Open", Status.DOING, 40)):
+            task = UserDatabase.deserialize_task(Task(title, "This is a test task", ["user1"]).to_dict())
+            task["status"] = status
+            task["end_time"] = datetime.now() - timedelta(days=age)
+            self.tasks.append(task)
+        self.users = {"user1": {"projects": {"managed": [{"id": "p1", "members": [], "tasks": list(self.tasks)}], "member": []}}}
+
+    def test_archive_and_restore(self):
+        self.assertEqual(TaskArchive.archive_tasks(self.users, done_after_days=30), 2)
+        project = self.users["user1"]["projects"]["managed"][0]
+        self.assertEqual([task["title"] for task in project["tasks"]], ["Recent", "Open"])
+
+        results = TaskArchive.search("user1", text="Old")
+        self.assertEqual([result["title"] for result in results], ["Old"])
+
+        restored = TaskArchive.restore(self.users, "user1", results[0]["task_id"])
+        self.assertEqual(restored["status"], Status.DONE)
+        self.assertIn(restored, project["tasks"])
+        self.assertEqual(TaskArchive.search("user1", text="Old"), [])
+
+    def test_restore_archived_task(self):
+        archived = self.tasks[2]
+        archived["history"] = [(datetime(2024, 1, 1), "Status changed to DOING"), (datetime(2024, 1, 2), "Status changed to ARCHIVED")]
+        TaskArchive.archive_tasks(self.users, done_after_days=30)
+        project = self.users["user1"]["projects"]["managed"][0]
+
+        project["tasks"].append(dict(archived, status=Status.BACKLOG))
+        with self.assertRaises(ValueError):
+            TaskArchive.restore(self.users, "user1", archived["id"])
+        project["tasks"].pop()
+
+        restored = TaskArchive.restore(self.users, "user1", archived["id"])
+        self.assertEqual(restored["status"], Status.DOING)
+        self.assertEqual(restored["history"][-1][1], "Status changed to DOING")
+        self.assertEqual([task["id"] for task in project["tasks"]].count(archived["id"]), 1)
+
+    def test_status_before_archiving(self):
+        task = {"history": [(datetime(2024, 1, 1), "Status changed to ARCHIVED")]}
+        self.assertEqual(TaskArchive.status_before_archiving(task), Status.BACKLOG)
+
+
+class TestHistoryRetention(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        patcher = patch("mmw.ARCHIVE_DATABASE_FILE", os.path.join(self.directory.name, "archive.db"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+        self.now = datetime(2024, 1, 31)
+        self.task = UserDatabase.deserialize_task(Task("Task", "This is a test task", ["user1"]).to_dict())
+        for day in range(1, 31):
+            self.task["history"].append((datetime(2024, 1, day), f"Status changed to {Status.DOING.name if day % 2 else Status.TODO.name}"))
+        self.task["comments"] = [(datetime(2024, 1, 2), "user1", "First"), (datetime(2024, 1, 30), "user2", "Last")]
+        self.project = {"id": "p1", "tasks": [self.task]}
+
+    def test_no_policy_keeps_everything(self):
+        self.assertIsNone(HistoryRetention.policy(0, 0))
+        self.assertEqual(HistoryRetention.enforce("user1", self.project, now=self.now), 0)
+        self.assertEqual(len(self.task["history"]), 30)
+
+    def test_summarize_last_entries(self):
+        self.project["retention"] = HistoryRetention.policy(max_entries=5)
+        self.assertEqual(HistoryRetention.enforce("user1", self.project, now=self.now), 25)
+        self.assertEqual([time.day for time, _ in self.task["history"]], [26, 27, 28, 29, 30])
+        self.assertEqual(len(self.task["comments"]), 2)
+        self.assertEqual(self.task["history_summary"]["history"], {"Status changed": 25})
+        self.assertEqual(self.task["history_summary"]["until"], datetime(2024, 1, 25).isoformat())
+
+    def test_archive_by_age(self):
+        self.project["retention"] = HistoryRetention.policy(max_age_days=7, mode="archive")
+        self.assertEqual(HistoryRetention.enforce("user1", self.project, now=self.now), 24)
+        self.assertEqual(self.task["history"][0][0], datetime(2024, 1, 24))
+        self.assertEqual(self.task["history_summary"]["comments"], {"user1": 1})
+        history, comments = TaskArchive.archived_history("user1", self.task["id"])
+        self.assertEqual(len(history), 23)
+        self.assertEqual(comments, [(datetime(2024, 1, 2), "user1", "First")])
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            HistoryRetention.policy(max_entries=-1)
+        with self.assertRaises(ValueError):
+            HistoryRetention.policy(max_entries=5, mode="delete")
+
+
+class TestFragmentCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = FragmentCache(max_size=2)
+        render = MagicMock(side_effect=lambda: "html")
+        cache.get_or_render(("a",), render)
+        cache.get_or_render(("b",), render)
+        cache.get_or_render(("a",), render)
+        cache.get_or_render(("c",), render)
+        self.assertEqual(list(cache.fragments), [("a",), ("c",)])
+        self.assertEqual(render.call_count, 3)
+
+    def test_project_card_is_escaped(self):
+        project = {"id": "p1", "title": "<script>alert(1)</script>", "description": "a & b", "members": ["user1"], "version": 0}
+        card = render_project_card("owner", project)
+        self.assertNotIn("<script>", card)
+        self.assertIn("&lt;script&gt;", card)
+        self.assertIn("a &amp; b", card)
+
+    def test_recreated_project_gets_new_card(self):
+        project = {"id": "p1", "title": "Old", "description": "", "members": [], "version": new_version()}
+        touch_project(project)
+        self.assertIn("Old", render_project_card("owner", project))
+        project = {"id": "p1", "title": "New", "description": "", "members": [], "version": new_version()}
+        self.assertIn("New", render_project_card("owner", project))
+
+
+class TestAssignmentIndex(unittest.TestCase):
+
+    def setUp(self):
+        def task(title, assignees, status, priority, days):
+            task = UserDatabase.deserialize_task(Task(title, "This is a test task", assignees).to_dict())
+            task.update(status=status, priority=priority.name, end_time=datetime(2024, 1, days))
+            return task
+
+        self.project1 = {"id": "p1", "title": "Project 1", "version": 0, "tasks": [
+            task("Later", ["user1"], Status.TODO, Priority.HIGH, 20),
+            task("Sooner", ["user1", "user2"], Status.TODO, Priority.HIGH, 10),
+            task("Critical", ["user1"], Status.TODO, Priority.CRITICAL, 30),
+        ]}
+        self.project2 = {"id": "p2", "title": "Project 2", "version": 0, "tasks": [task("Doing", ["user1"], Status.DOING, Priority.LOW, 5)]}
+        self.users = {
+            "user1": {"projects": {"managed": [self.project1], "member": []}},
+            "user2": {"projects": {"managed": [self.project2], "member": []}},
+        }
+        self.index = AssignmentIndex()
+        self.index.refresh(self.users)
+
+    def test_group_across_projects(self):
+        groups = AssignmentIndex.group(self.index.tasks("user1"))
+        self.assertEqual(list(groups), ["TODO", "DOING"])
+        self.assertEqual([row["title"] for row in groups["TODO"]], ["Critical", "Sooner", "Later"])
+        self.assertEqual(groups["DOING"][0]["owner"], "user2")
+
+    def test_versions_change_per_assignee(self):
+        versions = (self.index.version("user1"), self.index.version("user2"))
+        self.index.refresh(self.users)
+        self.assertEqual((self.index.version("user1"), self.index.version("user2")), versions)
+
+        # Only the users assigned in the changed project are invalidated, including removed assignees
+        self.project2["tasks"][0]["assignees"] = ["user3"]
+        self.project2["version"] = 1
+        self.index.refresh(self.users)
+        self.assertNotEqual(self.index.version("user1"), versions[0])
+        self.assertEqual(self.index.version("user2"), versions[1])
+        self.assertEqual([row["title"] for row in self.index.tasks("user3")], ["Doing"])
+
+        del self.users["user1"]
+        self.index.refresh(self.users)
+        self.assertNotEqual(self.index.version("user2"), versions[1])
+        self.assertEqual(self.index.tasks("user2"), [])
+
+
+class TestManager(unittest.TestCase):
+
+    def setUp(self):
+        # The data files are relative paths, so every test works in its own directory
+        self.directory = tempfile.TemporaryDirectory()
+        self.previous_directory = os.getcwd()
+        os.chdir(self.directory.name)
+        self.addCleanup(self.directory.cleanup)
+        self.addCleanup(os.chdir, self.previous_directory)
+
+        task = Task("Task", "This is a test task", ["user1", "user1", "ghost"]).to_dict()
+        task["priority"] = "low"
+        task["start_time"] = 1704067200
+        self.users = {
+            "user1": {"email": "a@test.com", "password": "x", "active": True, "projects": {"managed": [
+                {"id": "p1", "title": "Project", "description": "", "members": ["user2", "user2"], "tasks": [task], "version": 1},
+            ], "member": []}},
+            "user2": {"email": "b@test.com", "password": "x", "active": True, "projects": {"managed": [], "member": []}},
+        }
+        with open(manager.DATA_FILE, "w") as f:
+            json.dump(self.users, f, indent=4)
+
+    def verify(self, **kwargs):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            manager.verify_data(**kwargs)
+        return output.getvalue()
+
+    def test_iter_users_small_chunks(self):
+        users = list(manager.iter_users(manager.DATA_FILE, chunk_size=7))
+        self.assertEqual([(username, user) for username, user, _ in users], list(self.users.items()))
+        self.assertEqual(json.loads(users[0][2]), self.users["user1"])
+
+    def test_check_user(self):
+        issues = manager.check_user("user1", self.users["user1"], set(self.users), repair=False)
+        self.assertEqual(len(issues), 5)
+        self.assertFalse(any(fixed for _, fixed in issues))
+
+        project = self.users["user1"]["projects"]["managed"][0]
+        issues = manager.check_user("user1", self.users["user1"], set(self.users), repair=True)
+        self.assertTrue(all(fixed for _, fixed in issues))
+        self.assertEqual(project["members"], ["user2"])
+        self.assertEqual(project["tasks"][0]["assignees"], ["user1"])
+        self.assertEqual(project["tasks"][0]["priority"], "LOW")
+        self.assertGreater(project["version"], 1)
+
+    def test_check_user_reports_values_of_the_wrong_type(self):
+        project = self.users["user1"]["projects"]["managed"][0]
+        task = project["tasks"][0]
+        task.update(status=["DONE"], priority={"level": "HIGH"}, assignees="user1")
+        project["tasks"] += [["not", "a", "task"], dict(task, id=["t2"])]
+        self.users["user1"]["projects"]["managed"] += ["not a project", {"id": ["p2"], "members": "user2", "tasks": {}}]
+
+        issues = manager.check_user("user1", self.users["user1"], set(self.users), repair=True)
+        messages = [message for message, fixed in issues if not fixed]
+        self.assertIn("user1/p1/%s: invalid status ['DONE']" % task["id"], messages)
+        self.assertIn("user1/p1/%s: assignees 'user1' is not a list" % task["id"], messages)
+        self.assertIn("user1/p1: task 1 is not an object", messages)
+        self.assertIn("user1/p1/['t2']: task ID ['t2'] is not a string", messages)
+        self.assertIn("user1: managed project 1 is not an object", messages)
+        self.assertIn("user1/['p2']: members 'user2' is not a list", messages)
+        self.assertEqual(task["assignees"], "user1")
+        self.assertEqual(task["priority"], {"level": "HIGH"})
+
+    def test_repair_rewrites_data_and_publishes_event(self):
+        self.assertIn("5 issues found, 5 repaired", self.verify(repair=True))
+        with open(manager.DATA_FILE) as f:
+            project = json.load(f)["user1"]["projects"]["managed"][0]
+        self.assertEqual(project["members"], ["user2"])
+        self.assertGreater(project["version"], 1)
+        events, _ = ActivityLog.query([("user1", "p1")])
+        self.assertEqual([event["action"] for event in events], ["Data repaired by verify"])
+        self.assertIn("0 issues found", self.verify())
+
+    def test_incremental_skips_unchanged_users(self):
+        self.verify(repair=True, incremental=True)
+        self.assertIn("Checked 0 of 2 users", self.verify(incremental=True))
+        with open(manager.DATA_FILE) as f:
+            users = json.load(f)
+        users["user2"]["email"] = "c@test.com"
+        with open(manager.DATA_FILE, "w") as f:
+            json.dump(users, f, indent=4)
+        self.assertIn("Checked 1 of 2 users", self.verify(incremental=True))
+
+    def test_snapshot_jobs(self):
+        ActivityLog.record("user1", "p1", "user1", "Project created")
+        snapshot = manager.take_snapshot()
+        self.assertEqual(sorted(os.listdir(snapshot)), ["activity.db", "snapshot.json", "users.json"])
+        with open(os.path.join(snapshot, "snapshot.json")) as f:
+            self.assertTrue(json.load(f)["consistent"])
+
+        report = manager.report_job(snapshot)
+        self.assertIn("Users: 2 (2 active)", report)
+        self.assertIn("Tasks: 1", report)
+        self.assertIn("Activity events: 1", report)
+        self.assertEqual(manager.export_job(snapshot, "tasks.csv"), "Exported 1 tasks to tasks.csv.")
+        with open("tasks.csv") as f:
+            self.assertEqual(f.read().splitlines()[1].split(",")[:2], ["user1", "p1"])
+        self.assertIn("5 issues found, 0 repaired", manager.verify_job(snapshot))
+        self.assertFalse(os.path.exists(manager.VERIFY_STATE_FILE))
+
+    def test_snapshot_retries_when_data_file_is_saved(self):
+        copies = []
+        copy = shutil.copyfileobj
+
+        def copy_then_save(source, target):
+            copy(source, target)
+            if not copies:
+                # Another process saves while the snapshot is taken
+                with open("users.json.tmp", "w") as f:
+                    json.dump({}, f)
+                os.replace("users.json.tmp", manager.DATA_FILE)
+            copies.append(target.name)
+
+        with patch("manager.shutil.copyfileobj", side_effect=copy_then_save):
+            snapshot = manager.take_snapshot()
+        self.assertEqual(len(copies), 2)
+        with open(os.path.join(snapshot, "users.json")) as f:
+            self.assertEqual(json.load(f), {})
+
+    def test_snapshot_command_runs_jobs_in_pool(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            manager.main(["snapshot", "--report", "--export", "tasks.csv", "--verify"])
+        for section in ("== Report ==", "== Export ==", "== Verify ==", "5 issues found"):
+            self.assertIn(section, output.getvalue())
+
+
+class TestApi(tornado.testing.AsyncHTTPTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.previous_directory = os.getcwd()
+        os.chdir(self.directory.name)
+        self.addCleanup(self.directory.cleanup)
+        self.addCleanup(os.chdir, self.previous_directory)
+
+        password = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode()
+        tasks = [Task(f"Task {index}", "This is a test task", ["user1"]).to_dict() for index in range(3)]
+        users = {
+            "user1": {"email": "a@test.com", "password": password, "active": True, "projects": {"managed": [
+                {"id": "p1", "title": "Project", "description": "", "members": [], "tasks": tasks, "version": 1},
+            ], "member": []}},
+            "user2": {"email": "b@test.com", "password": password, "active": True, "projects": {"managed": [], "member": []}},
+        }
+        with open("users.json", "w") as f:
+            json.dump(users, f)
+        super().setUp()
+
+    def get_app(self):
+        self.store = api.Store()
+        return api.make_app(self.store)
+
+    def request(self, path, method="GET", body=None, user="user1", password="secret", headers=None):
+        credentials = base64.b64encode(f"{user}:{password}".encode()).decode()
+        return self.fetch(path, method=method, body=None if body is None else json.dumps(body),
+                          headers=dict(headers or {}, Authorization=f"Basic {credentials}"), raise_error=False)
+
+    def test_authentication(self):
+        self.assertEqual(self.fetch("/api/projects").code, 401)
+        self.assertEqual(self.request("/api/projects", password="wrong").code, 401)
+        self.assertEqual(self.request("/api/projects").code, 200)
+        self.assertEqual(self.request("/api/projects/user1/p1/tasks", user="user2").code, 403)
+
+    def test_paging_and_not_modified(self):
+        response = self.request("/api/projects/user1/p1/tasks?limit=2")
+        data = json.loads(response.body)
+        self.assertEqual((len(data["tasks"]), data["total"], data["next_offset"]), (2, 3, 2))
+        etag = response.headers["Etag"]
+        self.assertEqual(self.request("/api/projects/user1/p1/tasks?limit=2", headers={"If-None-Match": etag}).code, 304)
+        self.assertEqual(self.request("/api/projects/user1/p1/tasks?limit=2&offset=2", headers={"If-None-Match": etag}).code, 200)
+
+    def test_batch_validation(self):
+        path = "/api/projects/user1/p1/tasks"
+        for method, task in (("POST", {"title": "New", "assignees": None}), ("POST", {"title": "New", "assignees": "user2"}),
+                             ("POST", {"title": 5}), ("POST", {"title": "New", "priority": ["HIGH"]}), ("PATCH", {"id": [1]}),
+                             ("PATCH", {"id": "missing"}), ("PATCH", {"id": None, "title": ""})):
+            response = self.request(path, method, {"tasks": [{"title": "Valid"}, task]})
+            self.assertIn(response.code, (400, 404), (method, task))
+        self.assertEqual(len(self.store.current()["user1"]["projects"]["managed"][0]["tasks"]), 3)
+
+    def test_patch_records_history(self):
+        task_id = json.loads(self.request("/api/projects/user1/p1/tasks").body)["tasks"][0]["id"]
+        response = self.request("/api/projects/user1/p1/tasks", "PATCH", {"tasks": [{"id": task_id, "title": "Renamed", "status": "DOING"}]})
+        self.assertEqual(response.code, 200)
+        history = [change for _, change in json.loads(response.body)["tasks"][0]["history"]]
+        self.assertEqual(history, ["Status changed to DOING", "Title changed"])
+        events, _ = ActivityLog.query([("user1", "p1")])
+        self.assertEqual(sorted(event["action"] for event in events), ["Task 'Renamed': Status changed to DOING", "Task 'Renamed': Title changed"])
+        self.assertEqual(UserDatabase.load_users()["user1"]["projects"]["managed"][0]["tasks"][0]["title"], "Renamed")
+
+    def test_patch_persists_when_file_changes_during_request(self):
+        task_id = json.loads(self.request("/api/projects/user1/p1/tasks").body)["tasks"][0]["id"]
+        batch = api.TasksHandler.batch
+
+        def batch_then_rewrite(handler):
+            # The app saves the database while the request is being handled
+            UserDatabase.save_users(UserDatabase.load_users())
+            os.utime("users.json", ns=(0, 0))
+            return batch(handler)
+
+        with patch("api.TasksHandler.batch", batch_then_rewrite):
+            response = self.request("/api/projects/user1/p1/tasks", "PATCH", {"tasks": [{"id": task_id, "title": "Renamed"}]})
+        self.assertEqual(response.code, 200)
+        self.assertEqual(UserDatabase.load_users()["user1"]["projects"]["managed"][0]["tasks"][0]["title"], "Renamed")
+        self.assertEqual(self.request("/api/projects/user1/p1/tasks", "PATCH", {"tasks": [{"id": task_id, "priority": "HIGH"}]}).code, 200)
+
+    def test_archived_status_moves_task_to_archive(self):
+        task_id = json.loads(self.request("/api/projects/user1/p1/tasks").body)["tasks"][0]["id"]
+        response = self.request("/api/projects/user1/p1/tasks", "PATCH", {"tasks": [{"id": task_id, "status": "ARCHIVED"}]})
+        self.assertEqual(response.code, 200)
+        tasks = UserDatabase.load_users()["user1"]["projects"]["managed"][0]["tasks"]
+        self.assertNotIn(task_id, [task["id"] for task in tasks])
+        self.assertEqual([task["task_id"] for task in TaskArchive.search("user1")], [task_id])
 
 
 class TestUserActions(unittest.TestCase):